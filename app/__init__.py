@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse
 
 from app.api.v1 import api_router
 from app.core.config import settings
+from app.core.rate_limit import RateLimitExceeded, RateLimitMiddleware, rate_limiter, too_many_requests
+from app.core.security import PasswordHashingBusy
+from app.db.notifications import listener
+from app.db.schema import ensure_schema
+from app.db.session import engine
+from app.services.auth import cleanup_refresh_tokens
+from app.services.document import cleanup_document_changes
+from app.services.document_events import document_events
+from app.services.email import email_queue
+from app.services.token_revocation import load_permission_versions
+from app.services.totp_store import sweep_totp_secrets
 
 
 def create_app() -> FastAPI:
@@ -39,6 +53,10 @@ def create_app() -> FastAPI:
         return app.openapi_schema
 
     app.openapi = custom_openapi
+    # Token-bucket rate limiting; added before CORS so 429 responses carry CORS headers
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
     # Set up CORS middleware
     if settings.BACKEND_CORS_ORIGINS:
         app.add_middleware(
@@ -47,11 +65,86 @@ def create_app() -> FastAPI:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "Retry-After", "ETag"],
         )
 
     # Include routers
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
+    @app.exception_handler(PasswordHashingBusy)
+    async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Server is busy, please retry"},
+            headers={"Retry-After": "1"},
+        )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+        return too_many_requests(exc.retry_after)
+
+    # Check (or, with DB_AUTO_MIGRATE, upgrade) the schema first: the handlers
+    # below read columns that migrations add.
+    # Tables are managed by Alembic: run "alembic upgrade head" before starting workers.
+    @app.on_event("startup")
+    async def check_schema():
+        await ensure_schema(engine)
+
+    # Cross-worker notifications (cache invalidation, token revocation)
+    @app.on_event("startup")
+    async def start_listener():
+        await listener.start(engine)
+        await load_permission_versions()
+
+    @app.on_event("shutdown")
+    async def stop_listener():
+        await listener.stop()
+
+    # Document change push to connected clients
+    @app.on_event("startup")
+    async def start_document_events():
+        document_events.start()
+
+    @app.on_event("shutdown")
+    async def stop_document_events():
+        await document_events.stop()
+
+    # Expired TOTP secrets
+    @app.on_event("startup")
+    async def start_totp_sweeper():
+        app.state.totp_sweeper = asyncio.create_task(sweep_totp_secrets())
+
+    @app.on_event("shutdown")
+    async def stop_totp_sweeper():
+        app.state.totp_sweeper.cancel()
+
+    # Expired and rotated refresh tokens
+    @app.on_event("startup")
+    async def start_refresh_token_cleanup():
+        app.state.refresh_token_cleanup = asyncio.create_task(cleanup_refresh_tokens())
+
+    @app.on_event("shutdown")
+    async def stop_refresh_token_cleanup():
+        app.state.refresh_token_cleanup.cancel()
+
+    # Delta sync change log retention
+    @app.on_event("startup")
+    async def start_document_change_cleanup():
+        app.state.document_change_cleanup = asyncio.create_task(cleanup_document_changes())
+
+    @app.on_event("shutdown")
+    async def stop_document_change_cleanup():
+        app.state.document_change_cleanup.cancel()
+
+    # Background email delivery
+    @app.on_event("startup")
+    async def start_email_queue():
+        email_queue.start()
+
+    @app.on_event("shutdown")
+    async def stop_email_queue():
+        await email_queue.stop()
+
     # Custom API docs
     @app.get("/docs", include_in_schema=False)
     async def custom_swagger_ui_html():
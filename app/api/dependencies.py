@@ -1,4 +1,4 @@
-from typing import AsyncGenerator, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -8,10 +8,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.security import ALGORITHM
-from app.crud.crud_user import user_crud
 from app.db.session import SessionLocal
 from app.models.user import User
+from app.models.document import Document
 from app.schemas.token import TokenPayload
+from app.schemas.user import UserPrincipal
+from app.services.authorization import DocumentAction, get_document_permission, get_document_permissions
+from app.services.token_revocation import is_token_current
+from app.services.user_cache import get_cached_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -19,10 +23,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
+def decode_access_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[ALGORITHM]
@@ -34,21 +35,86 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = await user_crud.get(db, id=token_data.sub)
+    if token_data.type != "access" or not token_data.sub:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if token_data.pv is not None and not is_token_current(int(token_data.sub), token_data.pv):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+async def get_access_token_payload(token: str = Depends(oauth2_scheme)) -> TokenPayload:
+    """
+    Validated access token claims, for responses that outlive the request
+    check (event streams) and must re-check expiry and revocation.
+    """
+    return decode_access_token(token)
+
+async def _load_active_user(db: AsyncSession, token_data: TokenPayload) -> User:
+    user = await get_cached_user(db, int(token_data.sub))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return user
 
-async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
+def _principal_from_claims(token_data: TokenPayload) -> Optional[UserPrincipal]:
+    """
+    None for tokens issued without role claims, which need the user row.
+    """
+    if token_data.role is None or token_data.pv is None:
+        return None
+    if not token_data.active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return UserPrincipal(id=int(token_data.sub), role=token_data.role, is_active=True)
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
 ) -> User:
-    return current_user
+    """
+    Full user row (cached snapshot), for endpoints that need more than id and role.
+    """
+    return await _load_active_user(db, decode_access_token(token))
+
+async def get_current_active_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> UserPrincipal:
+    """
+    Authorize from the token claims alone; tokens without claims fall back to the user row.
+    """
+    token_data = decode_access_token(token)
+    principal = _principal_from_claims(token_data)
+    if principal is None:
+        user = await _load_active_user(db, token_data)
+        principal = UserPrincipal(id=user.id, role=user.role, is_active=user.is_active)
+    return principal
+
+async def get_streaming_user(
+    token_data: TokenPayload = Depends(get_access_token_payload),
+) -> UserPrincipal:
+    """
+    get_current_active_user for responses that outlive the request (event streams).
+    Tokens without claims load the user in a session of their own that is closed
+    before the response starts, so no pooled connection is held while streaming.
+    """
+    principal = _principal_from_claims(token_data)
+    if principal is None:
+        async with SessionLocal() as db:
+            user = await _load_active_user(db, token_data)
+        principal = UserPrincipal(id=user.id, role=user.role, is_active=user.is_active)
+    return principal
 
 async def get_current_active_manager(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> UserPrincipal:
     if current_user.role != "manager" and current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -57,11 +123,63 @@ async def get_current_active_manager(
     return current_user
 
 async def get_current_active_admin(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> UserPrincipal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
     return current_user
+
+PERMISSION_DENIED_DETAILS = {
+    DocumentAction.READ: "Not enough permissions to access this document",
+    DocumentAction.WRITE: "Not enough permissions to update this document",
+    DocumentAction.DELETE: "Not enough permissions to delete this document",
+    DocumentAction.SHARE: "Only owner can share documents",
+}
+
+async def authorize_document(
+    db: AsyncSession,
+    document_id: int,
+    current_user: UserPrincipal,
+    action: DocumentAction,
+) -> Document:
+    """
+    Load a document and check the caller may perform `action` on it.
+    One database round trip; raises 404 / 403.
+    """
+    permission = await get_document_permission(db, document_id, current_user)
+    if not permission.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found",
+        )
+    if not permission.allows(action):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=PERMISSION_DENIED_DETAILS[action],
+        )
+    return permission.document
+
+
+async def authorize_documents(
+    db: AsyncSession,
+    document_ids: List[int],
+    current_user: UserPrincipal,
+    action: DocumentAction,
+) -> Tuple[List[Document], List[Dict[str, Any]]]:
+    """
+    Batch variant of authorize_document: one query for all ids.
+    Returns the allowed documents in request order and a 404 / 403 error per other id.
+    """
+    permissions = await get_document_permissions(db, document_ids, current_user)
+    documents, errors = [], []
+    for document_id, permission in permissions.items():
+        if not permission.exists:
+            errors.append({"id": document_id, "status": status.HTTP_404_NOT_FOUND, "detail": "Document not found"})
+        elif not permission.allows(action):
+            errors.append({"id": document_id, "status": status.HTTP_403_FORBIDDEN, "detail": PERMISSION_DENIED_DETAILS[action]})
+        else:
+            documents.append(permission.document)
+    return documents, errors
@@ -5,15 +5,17 @@ from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_db, get_current_user
+from app.api.dependencies import get_db, get_current_active_user
 from app.core.config import settings
-from app.core.security import create_access_token, create_refresh_token
+from app.core.rate_limit import rate_limiter, login_account_rate
+from app.core.security import create_access_token, create_refresh_token, user_claims
 from app.crud.crud_token import token_crud
 from app.crud.crud_user import user_crud
 from app.models.user import User
 from app.schemas.token import Token, RefreshToken
-from app.schemas.user import UserCreate, UserInDB
+from app.schemas.user import UserCreate, UserInDB, UserPrincipal
 from app.services.auth import authenticate_user, verify_refresh_token, send_totp_code, verify_totp
+from app.services.user_cache import get_cached_user
 
 router = APIRouter()
 
@@ -48,6 +50,8 @@ async def login_init(
     OAuth2 compatible token login, get an access token for future requests.
     Step 1: Validate username/password and send TOTP code.
     """
+    # Per account, so spreading attempts over many IPs does not help
+    await rate_limiter.enforce(f"login:{form_data.username.lower()}", login_account_rate)
     user = await authenticate_user(db, email=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
@@ -71,6 +75,7 @@ async def login_access_token(
     """
     Step 2: Verify TOTP code and issue JWT tokens.
     """
+    await rate_limiter.enforce(f"totp:{email.lower()}", login_account_rate)
     # Verify TOTP code
     is_valid = await verify_totp(email, totp_code)
     if not is_valid:
@@ -93,7 +98,7 @@ async def login_access_token(
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
     access_token = create_access_token(
-        subject=str(user.id), expires_delta=access_token_expires
+        subject=str(user.id), expires_delta=access_token_expires, claims=user_claims(user)
     )
     refresh_token = create_refresh_token(
         subject=str(user.id), expires_delta=refresh_token_expires
@@ -117,32 +122,46 @@ async def refresh_token(
     """
     Refresh access token using refresh token.
     """
-    user_id = await verify_refresh_token(db, refresh_token.refresh_token)
+    user_id = verify_refresh_token(refresh_token.refresh_token)
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Fresh claims: role or activity may have changed since the last refresh
+    user = await get_cached_user(db, user_id)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     # Create new access token and refresh token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
     access_token = create_access_token(
-        subject=str(user_id), expires_delta=access_token_expires
+        subject=str(user_id), expires_delta=access_token_expires, claims=user_claims(user)
     )
     new_refresh_token = create_refresh_token(
         subject=str(user_id), expires_delta=refresh_token_expires
     )
     
-    # Update refresh token in database
-    await token_crud.update_refresh_token(
+    # Rotate atomically; fails if the old token was revoked, expired or already used
+    rotated = await token_crud.update_refresh_token(
         db, 
         user_id=user_id,
         old_refresh_token=refresh_token.refresh_token,
         new_refresh_token=new_refresh_token
     )
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     return {
         "access_token": access_token,
@@ -154,7 +173,7 @@ async def refresh_token(
 async def logout(
     *,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
     refresh_token: RefreshToken
 ) -> Any:
     """
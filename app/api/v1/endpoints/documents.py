@@ -1,22 +1,55 @@
+import asyncio
+import json
+import time
 from typing import Any, List, Optional
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, Response, UploadFile, File, \
+    status, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.util import greenlet_spawn
 
-from app.api.dependencies import get_db, get_current_active_user, get_current_active_manager, get_current_active_admin
-from app.crud.crud_document import document_crud
+from app.api.dependencies import get_db, get_current_active_user, get_current_active_manager, get_current_active_admin, \
+    authorize_document, authorize_documents, get_access_token_payload, get_streaming_user
+from app.core.config import settings
+from app.core.etag import weak_etag, etag_matches, etag_headers, not_modified
+from app.core.pagination import ChangeCursorExpired
+from app.core.serialization import schema_columns, sparse_fields, rows_to_dicts, fast_json_response
+from app.crud.crud_document import document_crud, SORTABLE_FIELDS
 from app.crud.crud_document_access import document_access_crud
-from app.models.user import User
+from app.crud.crud_user import user_crud
+from app.models.document import Document, DocumentVersion
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentInDB, DocumentListFilter, DocumentAccessCreate, \
-    DocumentAccessInDB
-from app.services.document import create_document, get_document_by_id, update_document, remove_document, search_documents, verify_document_integrity
-from app.services.minio import get_document_file
+    DocumentAccessInDB, DocumentChanges, DocumentBatch, DocumentBatchRequest, DocumentVersionSummary, \
+    DocumentShareRequest, DocumentUnshareRequest
+from app.schemas.token import TokenPayload
+from app.schemas.user import UserPrincipal
+from app.services.authorization import DocumentAction
+from app.services.document import create_document, update_document, remove_document, search_documents, verify_document_integrity, \
+    get_document_changes
+from app.services.document_events import document_events
+from app.services.token_revocation import is_token_current
+from app.services.minio import get_document_file, get_file
 
 router = APIRouter()
 
+# Projection served by the list endpoints' fast JSON path
+DOCUMENT_LIST_COLUMNS = schema_columns(DocumentInDB, Document)
+VERSION_LIST_COLUMNS = schema_columns(DocumentVersionSummary, DocumentVersion)
+
+
+def document_columns(fields: Optional[List[str]], sort_by: Optional[str] = None) -> List[Any]:
+    """
+    Columns to select for a sparse fieldset; the sort column is added for the cursor.
+    """
+    if fields is None:
+        return DOCUMENT_LIST_COLUMNS
+    names = list(fields)
+    if sort_by in SORTABLE_FIELDS and sort_by not in names:
+        names.append(sort_by)
+    return [getattr(Document, name) for name in names]
+
 @router.post("", response_model=DocumentInDB)
 async def create_new_document(
     *,
@@ -24,7 +57,8 @@ async def create_new_document(
     title: str,
     description: Optional[str] = None,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    background_tasks: BackgroundTasks,
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Create new document.
@@ -39,25 +73,37 @@ async def create_new_document(
         db=db, 
         obj_in=document_in, 
         file=file,
-        creator_id=current_user.id
+        creator_id=current_user.id,
+        background_tasks=background_tasks
     )
     return document
 
 @router.get("", response_model=List[DocumentInDB])
 async def read_documents(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
     title: Optional[str] = None,
     creator_id: Optional[int] = None,
     sort_by: Optional[str] = "created_at",
     sort_order: Optional[str] = "desc",
-    current_user: User = Depends(get_current_active_user),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,updated_at"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Retrieve documents.
+    Pass the X-Next-Cursor / X-Prev-Cursor header value back as `cursor`
+    to page by keyset; `skip` is ignored when a cursor is given.
+    `q` runs a ranked full-text search (offset paging only).
+    `fields` limits the response (and the query) to these fields plus id.
+    Send the ETag back in If-None-Match to get 304 when nothing changed.
     """
     filters = DocumentListFilter(
+        q=q,
         title=title,
         creator_id=creator_id,
         sort_by=sort_by,
@@ -67,40 +113,242 @@ async def read_documents(
     # Managers and admins can see all documents
     if current_user.role == "user":
         filters.creator_id = current_user.id
-        
-    documents = await search_documents(
-        db=db,
-        filters=filters,
-        skip=skip,
-        limit=limit,
-        user_id=current_user.id
+
+    try:
+        keys = sparse_fields(fields, DocumentInDB)
+        # Cheap aggregate over the whole result scope; answers 304 without running the page query
+        fingerprint = await document_crud.list_fingerprint(db, filters=filters, user_id=current_user.id)
+        etag = weak_etag(
+            "documents", current_user.id, sorted(request.query_params.multi_items()), *fingerprint
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        page = await search_documents(
+            db=db,
+            filters=filters,
+            skip=skip,
+            limit=limit,
+            user_id=current_user.id,
+            cursor=cursor,
+            columns=document_columns(keys, filters.sort_by)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    headers = etag_headers(etag)
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["prev_cursor"]:
+        headers["X-Prev-Cursor"] = page["prev_cursor"]
+    return fast_json_response(rows_to_dicts(page["items"], keys), headers=headers)
+
+@router.get("/changes", response_model=DocumentChanges)
+async def read_document_changes(
+    db: AsyncSession = Depends(get_db),
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Documents, versions and ACL entries created, updated or deleted since `since`.
+    Store the returned `cursor` and pass it as `since` on the next sync; without
+    `since` every accessible document is returned (full sync), `limit` per page.
+    410 means the log no longer reaches back to `since`: discard local state
+    and run a full sync.
+    """
+    try:
+        return await get_document_changes(db=db, user_id=current_user.id, since=since, limit=limit)
+    except ChangeCursorExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+def _token_ended(token_data: TokenPayload) -> Optional[str]:
+    """
+    Why a token accepted earlier is no longer valid: "expired", "revoked" or None.
+    """
+    if token_data.exp is not None and token_data.exp.timestamp() <= time.time():
+        return "expired"
+    if token_data.pv is not None and not is_token_current(int(token_data.sub), token_data.pv):
+        return "revoked"
+    return None
+
+@router.get("/events")
+async def stream_document_events(
+    current_user: UserPrincipal = Depends(get_streaming_user),
+    token_data: TokenPayload = Depends(get_access_token_payload),
+) -> Any:
+    """
+    Server-sent events for documents the user owns or was granted:
+    document.created / updated / deleted / shared / unshared, with the document id.
+    A `resync` event means events were lost; catch up via /documents/changes.
+    The token is re-checked before every event and keep-alive: when it expires
+    or is revoked (permission change, user deleted) a final `reauthenticate`
+    event is sent and the stream closes; reconnect with a fresh token.
+    """
+    queue = document_events.subscribe(current_user.id)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                timeout = settings.DOCUMENT_EVENTS_KEEPALIVE
+                if token_data.exp is not None:
+                    timeout = max(0, min(timeout, token_data.exp.timestamp() - time.time()))
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    event = None
+                reason = _token_ended(token_data)
+                if reason is not None:
+                    yield f"event: reauthenticate\ndata: {json.dumps({'type': 'reauthenticate', 'reason': reason})}\n\n"
+                    return
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            document_events.unsubscribe(current_user.id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return documents
 
-@router.get("/{document_id}", response_model=DocumentInDB)
-async def read_document(
+async def _read_document_batch(db: AsyncSession, ids: List[int], current_user: UserPrincipal) -> Any:
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No document ids given",
+        )
+    if len(ids) > settings.DOCUMENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.DOCUMENT_BATCH_MAX_SIZE} documents per request",
+        )
+    documents, errors = await authorize_documents(db, ids, current_user, DocumentAction.READ)
+    return {"documents": documents, "errors": errors}
+
+@router.get("/batch", response_model=DocumentBatch)
+async def read_documents_by_ids(
+    db: AsyncSession = Depends(get_db),
+    ids: str = Query(..., description="Comma-separated document ids"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get several documents by id in one request.
+    Ids that do not exist or cannot be read are reported in `errors`.
+    """
+    try:
+        document_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers",
+        )
+    return await _read_document_batch(db, document_ids, current_user)
+
+@router.post("/batch", response_model=DocumentBatch)
+async def read_documents_by_ids_body(
     *,
     db: AsyncSession = Depends(get_db),
-    document_id: int,
-    current_user: User = Depends(get_current_active_user),
+    batch_in: DocumentBatchRequest,
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Get document by ID.
+    Same as GET /documents/batch, for id lists too long for a query string.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
+    return await _read_document_batch(db, batch_in.ids, current_user)
+
+@router.get("/shared", response_model=List[DocumentInDB])
+async def read_shared_documents(
+    db: AsyncSession = Depends(get_db),
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort_by: str = "updated_at",
+    sort_order: str = "desc",
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,updated_at"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Documents shared with the current user, deleted ones excluded.
+    Pages like GET /documents: pass X-Next-Cursor / X-Prev-Cursor back as `cursor`.
+    """
+    try:
+        keys = sparse_fields(fields, DocumentInDB)
+        page = await document_access_crud.get_user_accessible_documents(
+            db,
+            user_id=current_user.id,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            columns=document_columns(keys, sort_by)
+        )
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
         )
-    
-    # Check if user has access to this document
-    if current_user.role == "user" and document.creator_id != current_user.id:
+    headers = {}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["prev_cursor"]:
+        headers["X-Prev-Cursor"] = page["prev_cursor"]
+    return fast_json_response(rows_to_dicts(page["items"], keys), headers=headers)
+
+@router.get("/{document_id}/access_list", response_model=List[DocumentInDB], deprecated=True)
+async def get_my_accessible_documents(
+    *,
+    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,updated_at"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Deprecated, use GET /documents/shared: all documents shared with the
+    current user in one unpaginated response, newest first (document_id is ignored).
+    """
+    try:
+        keys = sparse_fields(fields, DocumentInDB)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this document",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
         )
-        
+    page = await document_access_crud.get_user_accessible_documents(
+        db, user_id=current_user.id, limit=None, columns=document_columns(keys)
+    )
+    return fast_json_response(rows_to_dicts(page["items"], keys))
+
+@router.get("/{document_id}", response_model=DocumentInDB)
+async def read_document(
+    *,
+    db: AsyncSession = Depends(get_db),
+    document_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get document by ID.
+    """
+    document = await authorize_document(db, document_id, current_user, DocumentAction.READ)
+    etag = weak_etag("document", document.id, document.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
     return document
 
 @router.get("/{document_id}/download")
@@ -108,33 +356,21 @@ async def download_document(
     *,
     db: AsyncSession = Depends(get_db),
     document_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Download document file.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
+    document = await authorize_document(db, document_id, current_user, DocumentAction.READ)
+    if document.current_storage_path is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
-        )
-    
-    # Check if user has access to this document
-    has_access = (
-            document.creator_id == current_user.id or
-            await greenlet_spawn(lambda: any(access.user_id == current_user.id for access in document.access_list))
-    )
-
-    if not has_access:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this document",
+            detail="Document has no file",
         )
     
     # Get file from MinIO
     try:
-        file_obj = await get_document_file(document_id=document_id, version_id=document.current_version_id)
+        file_obj = await get_document_file(document.current_storage_path, document.current_nonce)
         filename = document.filename
         # Return file as streaming response
         return StreamingResponse(
@@ -150,30 +386,87 @@ async def download_document(
             detail=f"Failed to retrieve document file: {str(e)}",
         )
 
-@router.patch("/{document_id}", response_model=DocumentInDB)
-async def update_document_info(
+@router.get("/{document_id}/versions", response_model=List[DocumentVersionSummary])
+async def read_document_versions(
     *,
     db: AsyncSession = Depends(get_db),
     document_id: int,
-    document_in: DocumentUpdate,
-    current_user: User = Depends(get_current_active_user),
+    before: Optional[int] = Query(None, description="Continue after this version number"),
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. version_number,created_at"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Update document information.
+    List versions of a document, newest first.
+    For the next page pass the last version_number as `before`.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
+    await authorize_document(db, document_id, current_user, DocumentAction.READ)
+    try:
+        keys = sparse_fields(fields, DocumentVersionSummary, always=("id", "version_number"))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    columns = (
+        [getattr(DocumentVersion, name) for name in keys] if keys
+        else VERSION_LIST_COLUMNS
+    )
+    versions = await document_crud.list_versions(
+        db, document_id=document_id, columns=columns, before=before, limit=limit
+    )
+    return fast_json_response(rows_to_dicts(versions))
+
+@router.get("/{document_id}/versions/{version_number}/download")
+async def download_document_version(
+    *,
+    db: AsyncSession = Depends(get_db),
+    document_id: int,
+    version_number: int,
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Download a specific version. Versions never change, so the response is cacheable indefinitely.
+    """
+    await authorize_document(db, document_id, current_user, DocumentAction.READ)
+    version = await document_crud.get_version_by_number(
+        db, document_id=document_id, version_number=version_number
+    )
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
+            detail="Version not found",
         )
-    
-    # Check if user has access to update this document
-    if current_user.role == "user" and document.creator_id != current_user.id:
+    headers = {
+        "ETag": f'"{version.file_hash}"',
+        "Cache-Control": settings.VERSION_DOWNLOAD_CACHE_CONTROL,
+    }
+    # The content hash is a strong validator, revalidation skips the storage read
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    file_content = await get_file(version.storage_path, version.nonce)
+    if file_content is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to update this document",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve document file",
         )
+    headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(version.filename)}"
+    return Response(content=file_content, media_type=version.content_type, headers=headers)
+
+@router.patch("/{document_id}", response_model=DocumentInDB)
+async def update_document_info(
+    *,
+    db: AsyncSession = Depends(get_db),
+    document_id: int,
+    document_in: DocumentUpdate,
+    current_user: UserPrincipal = Depends(get_current_active_user),
+) -> Any:
+    """
+    Update document information.
+    """
+    await authorize_document(db, document_id, current_user, DocumentAction.WRITE)
     
     document = await update_document(
         db=db, 
@@ -189,24 +482,13 @@ async def upload_new_version(
     db: AsyncSession = Depends(get_db),
     document_id: int,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
+    background_tasks: BackgroundTasks,
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Upload a new version of an existing document.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
-        )
-    
-    # Check if user has access to update this document
-    if current_user.role == "user" and document.creator_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to update this document",
-        )
+    await authorize_document(db, document_id, current_user, DocumentAction.WRITE)
     
     # Update document with new file
     document_update = DocumentUpdate(
@@ -219,7 +501,8 @@ async def upload_new_version(
         document_id=document_id, 
         obj_in=document_update,
         file=file,
-        user_id=current_user.id
+        user_id=current_user.id,
+        background_tasks=background_tasks
     )
     return document
 
@@ -228,24 +511,12 @@ async def delete_document(
     *,
     db: AsyncSession = Depends(get_db),
     document_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Delete a document.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
-        )
-    
-    # Check if user has access to delete this document
-    if current_user.role == "user" and document.creator_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to delete this document",
-        )
+    await authorize_document(db, document_id, current_user, DocumentAction.DELETE)
     
     document = await remove_document(db=db, document_id=document_id)
     return document
@@ -255,27 +526,15 @@ async def verify_integrity(
     *,
     db: AsyncSession = Depends(get_db),
     document_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Verify document integrity using the hash chain.
     """
-    document = await get_document_by_id(db=db, document_id=document_id)
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found",
-        )
-    
-    # Check if user has access to this document
-    if current_user.role == "user" and document.creator_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this document",
-        )
+    document = await authorize_document(db, document_id, current_user, DocumentAction.READ)
     
     # Verify document integrity
-    is_valid, message = await verify_document_integrity(db=db, document_id=document_id)
+    is_valid, message = await verify_document_integrity(db=db, document=document)
     
     return {
         "is_valid": is_valid,
@@ -289,18 +548,23 @@ async def share_document(
         db: AsyncSession = Depends(get_db),
         document_id: int,
         access_in: DocumentAccessCreate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: UserPrincipal = Depends(get_current_active_user),
 ):
-    document = await get_document_by_id(db, document_id)
-    if document.creator_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Only owner can share documents")
+    await authorize_document(db, document_id, current_user, DocumentAction.SHARE)
+    await _require_users(db, [access_in.user_id])
 
-    return await document_access_crud.grant_access(
-        db,
-        document_id=document_id,
-        user_id=access_in.user_id,
-        access_level=access_in.access_level
-    )
+    try:
+        return await document_access_crud.grant_access(
+            db,
+            document_id=document_id,
+            user_id=access_in.user_id,
+            access_level=access_in.access_level
+        )
+    except IntegrityError:
+        # The user was deleted after the check
+        await db.rollback()
+        await _require_users(db, [access_in.user_id])
+        raise
 
 
 @router.delete("/{document_id}/share/{user_id}")
@@ -308,24 +572,82 @@ async def revoke_access(
         *,
         db: AsyncSession = Depends(get_db),
         document_id: int,
-        access_in: DocumentAccessCreate,
-        current_user: User = Depends(get_current_active_user)):
+        user_id: int,
+        current_user: UserPrincipal = Depends(get_current_active_user)):
     # Аналогичная проверка прав
-    await document_access_crud.revoke_access(db, document_id=document_id, user_id=current_user.id)
+    await authorize_document(db, document_id, current_user, DocumentAction.SHARE)
+    await document_access_crud.revoke_access(db, document_id=document_id, user_id=user_id)
     return {"status": "success"}
 
 
-@router.get("/{document_id}/access_list")
-async def get_my_accessible_documents(
+async def _authorize_sharing(db: AsyncSession, document_ids: List[int], current_user: UserPrincipal) -> None:
+    """
+    Bulk grants are all or nothing: fail unless every document may be shared.
+    """
+    if len(document_ids) > settings.DOCUMENT_SHARE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.DOCUMENT_SHARE_BATCH_MAX_SIZE} grants per request",
+        )
+    _, errors = await authorize_documents(db, list(dict.fromkeys(document_ids)), current_user, DocumentAction.SHARE)
+    if errors:
+        raise HTTPException(status_code=errors[0]["status"], detail=errors)
+
+
+async def _require_users(db: AsyncSession, user_ids: List[int]) -> None:
+    """
+    Grants to unknown users fail with 422 listing them, instead of a foreign key error.
+    """
+    missing = await user_crud.get_missing_ids(db, ids=user_ids)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[
+                {"user_id": user_id, "status": status.HTTP_422_UNPROCESSABLE_ENTITY, "detail": "User not found"}
+                for user_id in missing
+            ],
+        )
+
+
+@router.post("/shares", response_model=List[DocumentAccessInDB])
+async def share_documents(
         *,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db),
+        share_in: DocumentShareRequest,
+        current_user: UserPrincipal = Depends(get_current_active_user),
 ):
     """
-    Получить все документы, к которым у текущего пользователя есть доступ
+    Grant access in bulk, e.g. many users on one document or one user on many
+    documents. Applied in one transaction; existing grants get the new level.
     """
-    # Получаем все документы, где пользователь имеет доступ
-    accessible_documents = await document_access_crud.get_user_accessible_documents(
-        db, user_id=current_user.id
+    await _authorize_sharing(db, [grant.document_id for grant in share_in.grants], current_user)
+    user_ids = [grant.user_id for grant in share_in.grants]
+    await _require_users(db, user_ids)
+    try:
+        return await document_access_crud.grant_access_bulk(
+            db,
+            grants=[(grant.document_id, grant.user_id, grant.access_level) for grant in share_in.grants]
+        )
+    except IntegrityError:
+        # A user was deleted after the check
+        await db.rollback()
+        await _require_users(db, user_ids)
+        raise
+
+
+@router.post("/shares/revoke")
+async def revoke_documents_access(
+        *,
+        db: AsyncSession = Depends(get_db),
+        unshare_in: DocumentUnshareRequest,
+        current_user: UserPrincipal = Depends(get_current_active_user),
+):
+    """
+    Revoke access in bulk with a single statement.
+    """
+    await _authorize_sharing(db, [grant.document_id for grant in unshare_in.grants], current_user)
+    revoked = await document_access_crud.revoke_access_bulk(
+        db,
+        grants=[(grant.document_id, grant.user_id) for grant in unshare_in.grants]
     )
-    return accessible_documents
+    return {"status": "success", "revoked": revoked}
@@ -4,7 +4,11 @@ from typing import List
 from starlette import status
 
 from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.core.security import password_hashing_stats
 from app.schemas.env import EnvVarsResponse
+from app.services.document_events import document_events
+from app.services.email import email_queue
 from app.schemas.user import User
 
 router = APIRouter()
@@ -21,3 +25,14 @@ async def get_environment_vars():
 async def get_environment_vars():
     """Get exposed environment variables"""
     return status.HTTP_200_OK
+
+
+@router.get("/metrics", dependencies=[])
+async def get_metrics():
+    """Get runtime metrics of this worker"""
+    return {
+        "password_hashing": password_hashing_stats(),
+        "email_queue": email_queue.stats(),
+        "rate_limit": {"rejected": rate_limiter.rejected},
+        "document_event_connections": document_events.connections(),
+    }
@@ -1,18 +1,25 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_db, get_current_active_user, get_current_active_admin
+from app.api.dependencies import get_db, get_current_user, get_current_active_user, get_current_active_admin
+from app.core.etag import weak_etag, etag_matches, etag_headers, not_modified
+from app.core.serialization import schema_columns, rows_to_dicts, fast_json_response
 from app.crud.crud_user import user_crud
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserInDB
+from app.schemas.user import UserCreate, UserUpdate, UserInDB, UserPrincipal
+from app.services.token_revocation import REVOKED_ALL, publish_permission_version
+from app.services.user_cache import invalidate_user
 
 router = APIRouter()
 
+# Projection served by read_users' fast JSON path
+USER_LIST_COLUMNS = schema_columns(UserInDB, User)
+
 @router.get("/me", response_model=UserInDB)
 async def read_user_me(
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Get current user.
@@ -24,33 +31,53 @@ async def update_user_me(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Update current user.
     """
-    user = await user_crud.update(db, db_obj=current_user, obj_in=user_in)
+    # current_user is a cached snapshot, update the actual row
+    user = await user_crud.get(db, id=current_user.id)
+    perm_version = user.perm_version
+    user = await user_crud.update(db, db_obj=user, obj_in=user_in)
+    await invalidate_user(db, user.id)
+    if user.perm_version != perm_version:
+        await publish_permission_version(db, user.id, user.perm_version)
+    # Delivers the notifications
+    await db.commit()
     return user
 
 @router.get("", response_model=List[UserInDB])
 async def read_users(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    _: User = Depends(get_current_active_admin),
+    search: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    _: UserPrincipal = Depends(get_current_active_admin),
 ) -> Any:
     """
     Retrieve users. Admin only.
+    `search` matches a fragment of the email or full name.
+    Send the ETag back in If-None-Match to get 304 when nothing changed.
     """
-    users = await user_crud.get_multi(db, skip=skip, limit=limit)
-    return users
+    count, last_updated = await user_crud.list_fingerprint(db, query=search)
+    etag = weak_etag("users", sorted(request.query_params.multi_items()), count, last_updated)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if search:
+        users = await user_crud.search(db, query=search, skip=skip, limit=limit, columns=USER_LIST_COLUMNS)
+    else:
+        users = await user_crud.get_multi(db, skip=skip, limit=limit, columns=USER_LIST_COLUMNS)
+    return fast_json_response(rows_to_dicts(users), headers=etag_headers(etag))
 
 @router.post("", response_model=UserInDB)
 async def create_user(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
-    _: User = Depends(get_current_active_admin),
+    _: UserPrincipal = Depends(get_current_active_admin),
 ) -> Any:
     """
     Create new user. Admin only.
@@ -68,7 +95,7 @@ async def create_user(
 async def read_user_by_id(
     user_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserPrincipal = Depends(get_current_active_user),
 ) -> Any:
     """
     Get a specific user by id.
@@ -92,7 +119,7 @@ async def update_user(
     db: AsyncSession = Depends(get_db),
     user_id: int,
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: UserPrincipal = Depends(get_current_active_admin),
 ) -> Any:
     """
     Update a user. Admin only.
@@ -103,7 +130,13 @@ async def update_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
+    perm_version = user.perm_version
     user = await user_crud.update(db, db_obj=user, obj_in=user_in)
+    await invalidate_user(db, user_id)
+    if user.perm_version != perm_version:
+        await publish_permission_version(db, user_id, user.perm_version)
+    # Delivers the notifications
+    await db.commit()
     return user
 
 @router.delete("/{user_id}", response_model=UserInDB)
@@ -111,7 +144,7 @@ async def delete_user(
     *,
     db: AsyncSession = Depends(get_db),
     user_id: int,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: UserPrincipal = Depends(get_current_active_admin),
 ) -> Any:
     """
     Delete a user. Admin only.
@@ -123,4 +156,8 @@ async def delete_user(
             detail="User not found",
         )
     user = await user_crud.remove(db, id=user_id)
+    await invalidate_user(db, user_id)
+    await publish_permission_version(db, user_id, REVOKED_ALL)
+    # Delivers the notifications
+    await db.commit()
     return user
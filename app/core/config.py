@@ -11,6 +11,21 @@ class Settings(BaseSettings):
     ENCRYPTION_KEY: bytes = base64.b64decode(os.getenv("ENCRYPTION_KEY", "MDEyMzQ1Njc4OWFiY2RlZmdoaWprbG1ub3BxcnN0dXZ3eHl6MTIzNDU2"))  # это пример base64-строки на 32 байта
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Expired/invalidated refresh tokens are deleted in batches this often
+    REFRESH_TOKEN_CLEANUP_INTERVAL: int = int(os.environ.get("REFRESH_TOKEN_CLEANUP_INTERVAL", "3600"))  # seconds
+    REFRESH_TOKEN_CLEANUP_BATCH_SIZE: int = 1000
+    # Delta sync change log: entries older than this are deleted; clients whose
+    # cursor predates the deleted entries get 410 and run a full sync
+    DOCUMENT_CHANGES_RETENTION_DAYS: int = int(os.environ.get("DOCUMENT_CHANGES_RETENTION_DAYS", "30"))
+    DOCUMENT_CHANGES_CLEANUP_INTERVAL: int = int(os.environ.get("DOCUMENT_CHANGES_CLEANUP_INTERVAL", "3600"))  # seconds
+    DOCUMENT_CHANGES_CLEANUP_BATCH_SIZE: int = 1000
+    # Password hashing: bcrypt cost and the bounded pool it runs in
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+    # Authenticated user snapshots, invalidated on write and across workers via NOTIFY
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 10_000
     
     # PostgreSQL
     POSTGRES_SERVER: str = os.environ.get("PGHOST", "localhost")
@@ -19,6 +34,9 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.environ.get("PGDATABASE", "document_management")
     POSTGRES_PORT: str = os.environ.get("PGPORT", "5432")
     DATABASE_URL: Optional[PostgresDsn] = os.environ.get("DATABASE_URL")
+    # Upgrade the schema on worker startup (guarded by an advisory lock)
+    # instead of running "alembic upgrade head" as a separate step
+    DB_AUTO_MIGRATE: bool = os.environ.get("DB_AUTO_MIGRATE", "False").lower() == "true"
 
     @validator("DATABASE_URL", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -40,6 +58,11 @@ class Settings(BaseSettings):
     MINIO_BUCKET_NAME: str = os.environ.get("MINIO_BUCKET_NAME", "documents")
     MINIO_SECURE: bool = os.environ.get("MINIO_SECURE", "False").lower() == "true"
 
+    # Full-text search
+    # Extracted file text is stored unencrypted in Postgres, so it is opt-in
+    SEARCH_EXTRACT_CONTENT: bool = os.environ.get("SEARCH_EXTRACT_CONTENT", "False").lower() == "true"
+    SEARCH_MAX_CONTENT_CHARS: int = 200_000
+
     # Email
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = 587
@@ -48,6 +71,16 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = os.environ.get("SMTP_PASSWORD")
     EMAILS_FROM_EMAIL: Optional[str] = os.environ.get("EMAILS_FROM_EMAIL", "info@example.com")
     EMAILS_FROM_NAME: Optional[str] = os.environ.get("EMAILS_FROM_NAME", "Document Management System")
+    # When disabled, emails are only logged (development)
+    EMAILS_ENABLED: bool = os.environ.get("EMAILS_ENABLED", "False").lower() == "true"
+    SMTP_TIMEOUT: int = 10  # seconds
+    SMTP_IDLE_TIMEOUT: int = 60  # reconnect if the connection was unused this long
+    EMAIL_QUEUE_MAX_SIZE: int = 1000
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_MAX_RETRIES: int = 5
+    EMAIL_RETRY_BACKOFF: int = 2  # seconds, doubled on every attempt
+    EMAIL_DEAD_LETTER_SIZE: int = 100
+    EMAIL_SHUTDOWN_TIMEOUT: int = 10  # seconds
     
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -64,6 +97,51 @@ class Settings(BaseSettings):
     TOTP_ISSUER: str = "Secure Document Management"
     TOTP_DIGITS: int = 6
     TOTP_INTERVAL: int = 300  # seconds
+    # Where pending TOTP secrets live: "postgres", "redis" or "memory" (single worker only)
+    TOTP_STORE: str = os.environ.get("TOTP_STORE", "postgres")
+    TOTP_SWEEP_INTERVAL: int = 60  # seconds
+    REDIS_URL: str = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+    # Rate limiting (token buckets, rates are "<requests>/<second|minute|hour>")
+    RATE_LIMIT_ENABLED: bool = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # "memory" (per worker) or "redis" (shared between workers, uses REDIS_URL)
+    RATE_LIMIT_BACKEND: str = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    # Number of reverse proxies in front of the app that append to X-Forwarded-For.
+    # The client IP is the address the outermost trusted proxy saw, counted from the
+    # right; anything further left is client-supplied and ignored.
+    #   0 - clients connect directly (docker-compose publishes web:5000), the header is ignored
+    #   1 - behind the bundled nginx.conf ($proxy_add_x_forwarded_for)
+    #   N - N proxies, e.g. a load balancer in front of nginx
+    # Set it to the real number of hops: 0 behind nginx puts every client in one bucket,
+    # too many lets clients pick their own bucket.
+    RATE_LIMIT_TRUSTED_PROXIES: int = int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+    RATE_LIMIT_PER_IP: str = "600/minute"
+    RATE_LIMIT_PER_ACCOUNT: str = "600/minute"
+    # Per IP, per route; keys are "<METHOD> <path relative to API_V1_STR>"
+    RATE_LIMIT_ROUTES: Dict[str, str] = {
+        "POST /auth/register": "5/minute",
+        "POST /auth/login-init": "10/minute",
+        "POST /auth/login": "10/minute",
+        "POST /auth/refresh-token": "30/minute",
+    }
+    # Per email address on login-init / login, whatever IP the attempts come from
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "5/minute"
+
+    # Version downloads never change. Keep "private" unless the proxy cache keys on the caller.
+    VERSION_DOWNLOAD_CACHE_CONTROL: str = os.environ.get(
+        "VERSION_DOWNLOAD_CACHE_CONTROL", "private, max-age=31536000, immutable"
+    )
+
+    # Maximum ids per /documents/batch request
+    DOCUMENT_BATCH_MAX_SIZE: int = 100
+    # Maximum grants per bulk share / revoke request
+    DOCUMENT_SHARE_BATCH_MAX_SIZE: int = 1000
+
+    # Document change push (server-sent events)
+    DOCUMENT_EVENTS_BACKLOG: int = 1000  # NOTIFY payloads waiting for dispatch, per worker
+    DOCUMENT_EVENTS_CLIENT_QUEUE_SIZE: int = 100  # undelivered events per connection before resync
+    DOCUMENT_EVENTS_KEEPALIVE: int = 15  # seconds
 
     EXPOSED_ENV_VARS: ClassVar[List[str]] = [
         "TOTP_INTERVAL",
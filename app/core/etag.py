@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response, status
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    Weak ETag over the given parts (scope, request parameters, count, max(updated_at)...).
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison against an If-None-Match header, as required for GET.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+
+
+def etag_headers(etag: str) -> dict:
+    # Responses are per user: revalidate every time, never store in shared caches
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
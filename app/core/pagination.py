@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def encode_cursor(
+    sort_by: str, sort_order: str, value: Any, id: int, direction: str = "next"
+) -> str:
+    """
+    Encode a keyset position (sort value + id) into an opaque cursor token.
+    """
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = {"s": sort_by, "o": sort_order, "v": value, "id": id, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """
+    Decode a cursor token produced by encode_cursor.
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        value = payload["v"]
+        if isinstance(value, dict) and "dt" in value:
+            value = datetime.fromisoformat(value["dt"])
+        cursor = {
+            "sort_by": payload["s"],
+            "sort_order": payload["o"],
+            "value": value,
+            "id": int(payload["id"]),
+            "direction": payload.get("d", "next"),
+        }
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor["direction"] not in ("next", "prev"):
+        raise ValueError("Invalid cursor")
+    return cursor
+
+
+def cursor_value(value: Any, python_type: type) -> Any:
+    """
+    Check a decoded cursor value against the Python type of its column, so a
+    tampered cursor fails as a bad request instead of in the database.
+    Raises ValueError on a mismatch.
+    """
+    if python_type is int:
+        # bool is an int subclass; Integer columns are 32-bit
+        if isinstance(value, bool) or not isinstance(value, int) or not -2**31 <= value < 2**31:
+            raise ValueError("Invalid cursor")
+    elif not isinstance(value, python_type) or (isinstance(value, str) and "\x00" in value):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def cursor_for(
+    obj: Any, sort_by: str, sort_order: str, direction: str = "next"
+) -> Optional[str]:
+    """
+    Build a cursor pointing at the given row.
+    """
+    if obj is None:
+        return None
+    return encode_cursor(sort_by, sort_order, getattr(obj, sort_by), obj.id, direction)
+
+
+def encode_change_cursor(txid: int, id: int) -> str:
+    """
+    Encode a position in the document change log.
+    """
+    raw = f"{txid}.{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_change_cursor(token: str) -> Tuple[int, int]:
+    """
+    Decode a cursor produced by encode_change_cursor into (txid, id).
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        txid, id = raw.split(".")
+        return int(txid), int(id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_snapshot_cursor(xmin: int, document_id: int) -> str:
+    """
+    Encode a position in a full sync: the transaction horizon the sync
+    started at and the last document id returned.
+    """
+    raw = f"s{xmin}.{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_snapshot_cursor(token: str) -> Optional[Tuple[int, int]]:
+    """
+    Decode a cursor produced by encode_snapshot_cursor into (xmin, document_id);
+    None if the token is a change log cursor. Raises ValueError if malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        if not raw.startswith("s"):
+            return None
+        xmin, document_id = raw[1:].split(".")
+        return int(xmin), int(document_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class ChangeCursorExpired(ValueError):
+    """
+    The change log has been trimmed past the cursor; the client must run a full sync.
+    """
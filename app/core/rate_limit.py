@@ -0,0 +1,253 @@
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from jose import jwt, JWTError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import ALGORITHM
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Rate:
+    """
+    Token bucket parameters: `capacity` requests of burst, refilled at `capacity / period`.
+    """
+
+    def __init__(self, capacity: int, period: int):
+        self.capacity = capacity
+        self.refill_rate = capacity / period
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """
+        Parse "<requests>/<second|minute|hour|day>", e.g. "10/minute".
+        """
+        count, _, period = value.partition("/")
+        if period not in PERIODS or int(count) <= 0:
+            raise ValueError(f"Invalid rate: {value}")
+        return cls(int(count), PERIODS[period])
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a bucket is empty; `retry_after` is in seconds.
+    """
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Take `cost` tokens from the bucket. Returns (allowed, seconds until allowed).
+        """
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-worker buckets with LRU eviction. Evicting an idle bucket only forgets
+    tokens that would have been refilled anyway.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(rate.capacity), now]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(rate.capacity, bucket[0] + (now - bucket[1]) * rate.refill_rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return True, 0.0
+        return False, (cost - bucket[0]) / rate.refill_rate
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Buckets shared by all workers. The refill/consume step is one Lua script, so it is
+    atomic, and uses the Redis clock so workers with skewed clocks agree.
+    `client` is a redis.asyncio client or a compatible stand-in.
+    """
+
+    KEY_PREFIX = "ratelimit:"
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = (cost - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, client: Any):
+        self._client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    async def consume(self, key: str, rate: Rate, cost: int = 1) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[self.KEY_PREFIX + key], args=[rate.capacity, rate.refill_rate, cost]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimitBackend(maxsize=settings.RATE_LIMIT_MAX_KEYS)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        # Optional dependency, only needed for this backend
+        from redis import asyncio as redis_asyncio
+        return RedisRateLimitBackend(redis_asyncio.from_url(settings.REDIS_URL))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rejected = 0
+
+    async def check(self, key: str, rate: Rate, cost: int = 1) -> Optional[float]:
+        """
+        Consume from the bucket; returns None if allowed, else seconds to wait.
+        Backend errors let the request through rather than failing it.
+        """
+        try:
+            allowed, retry_after = await self.backend.consume(key, rate, cost)
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed: {str(e)}")
+            return None
+        if allowed:
+            return None
+        self.rejected += 1
+        return retry_after
+
+    async def enforce(self, key: str, rate: Rate, cost: int = 1) -> None:
+        """
+        Like check, but raises RateLimitExceeded.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        retry_after = await self.check(key, rate, cost)
+        if retry_after is not None:
+            raise RateLimitExceeded(retry_after)
+
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
+
+login_account_rate = Rate.parse(settings.RATE_LIMIT_LOGIN_PER_ACCOUNT)
+
+
+def too_many_requests(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """
+    Applies the per-IP, per-route and per-account buckets before the request
+    reaches routing, dependencies or the database.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+        self.ip_rate = Rate.parse(settings.RATE_LIMIT_PER_IP)
+        self.account_rate = Rate.parse(settings.RATE_LIMIT_PER_ACCOUNT)
+        self.route_rates = {
+            route: Rate.parse(rate) for route, rate in settings.RATE_LIMIT_ROUTES.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if not path.startswith(settings.API_V1_STR) or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        ip = self._client_ip(scope)
+        checks = [(f"ip:{ip}", self.ip_rate)]
+        route = f"{scope['method']} {path[len(settings.API_V1_STR):]}"
+        route_rate = self.route_rates.get(route)
+        if route_rate is not None:
+            checks.append((f"route:{route}:{ip}", route_rate))
+        user_id = self._user_id(scope)
+        if user_id is not None:
+            checks.append((f"user:{user_id}", self.account_rate))
+
+        for key, rate in checks:
+            retry_after = await self.limiter.check(key, rate)
+            if retry_after is not None:
+                await too_many_requests(retry_after)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _client_ip(scope: Scope) -> str:
+        """
+        Each trusted proxy appends the address it received the request from, so
+        the client is RATE_LIMIT_TRUSTED_PROXIES entries from the right. Entries
+        left of that were sent by the client and can be anything.
+        """
+        hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+        if hops > 0:
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            if len(forwarded) >= hops:
+                return forwarded[-hops]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _user_id(scope: Scope) -> Optional[str]:
+        # Signature is checked so a forged token cannot drain someone else's bucket
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer":
+                    return None
+                try:
+                    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+                except JWTError:
+                    return None
+                return payload.get("sub")
+        return None
@@ -1,5 +1,9 @@
+import asyncio
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 import os
 
 from jose import jwt
@@ -8,12 +12,26 @@ from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt is CPU bound (~100-300 ms per call), run it off the event loop
+_hashing_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hashing_stats = {"pending": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+
+class PasswordHashingBusy(Exception):
+    """
+    Raised when the password hashing pool has too many pending jobs.
+    """
 
 ALGORITHM = "HS256"
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[Dict[str, Any]] = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -22,9 +40,18 @@ def create_access_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode = {"exp": expire, "sub": str(subject), "type": "access"}
+    if claims:
+        to_encode.update(claims)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def user_claims(user: Any) -> Dict[str, Any]:
+    """
+    Authorization claims embedded in access tokens so requests can be
+    authorized without loading the user row.
+    """
+    return {"role": user.role, "active": bool(user.is_active), "pv": user.perm_version or 0}
+
 def create_refresh_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -32,16 +59,88 @@ def create_refresh_token(
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    # jti keeps tokens issued to the same user within one second distinct
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def hash_token(token: str) -> str:
+    """
+    Fixed-length digest under which refresh tokens are stored and looked up.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    True if the hash uses a deprecated scheme or a bcrypt cost other than BCRYPT_ROUNDS.
+    """
+    if pwd_context.needs_update(hashed_password):
+        return True
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def _verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if password_needs_rehash(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+async def _run_hashing(func: Callable[..., Any], *args: Any) -> Any:
+    if _hashing_stats["pending"] >= settings.PASSWORD_HASH_MAX_PENDING:
+        _hashing_stats["rejected"] += 1
+        raise PasswordHashingBusy()
+    _hashing_stats["pending"] += 1
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_hashing_executor, func, *args)
+    except BaseException:
+        # Hashing errors and cancelled requests (client went away)
+        _hashing_stats["failed"] += 1
+        raise
+    finally:
+        _hashing_stats["pending"] -= 1
+    _hashing_stats["completed"] += 1
+    return result
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool.
+    Returns (is_valid, new_hash); new_hash is set when the stored hash should be upgraded.
+    """
+    return await _run_hashing(_verify_and_rehash, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a password in the hashing pool.
+    """
+    return await _run_hashing(get_password_hash, password)
+
+def password_hashing_stats() -> Dict[str, int]:
+    """
+    Queue depth of the password hashing pool.
+    """
+    workers = settings.PASSWORD_HASH_WORKERS
+    pending = _hashing_stats["pending"]
+    return {
+        "workers": workers,
+        "in_flight": min(pending, workers),
+        "queued": max(pending - workers, 0),
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+        "completed": _hashing_stats["completed"],
+        "failed": _hashing_stats["failed"],
+        "rejected": _hashing_stats["rejected"],
+    }
+
 def encrypt_file(file_content: bytes) -> tuple[bytes, bytes]:
     """
     Encrypts file content using AES-256-GCM.
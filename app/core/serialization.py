@@ -0,0 +1,58 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson response; UTC datetimes end in "Z" like pydantic's own output.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def schema_columns(schema: Type[BaseModel], model: Any) -> List[Any]:
+    """
+    Model columns for the fields of a response schema, in schema order.
+    Selecting these instead of the entity skips ORM hydration.
+    """
+    table_columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.__fields__ if name in table_columns]
+
+
+def sparse_fields(fields: Optional[str], schema: Type[BaseModel], always: Iterable[str] = ("id",)) -> Optional[List[str]]:
+    """
+    Parse a `fields=a,b,c` parameter against the schema's fields.
+    Returns None when no fieldset was requested; `always` fields are included.
+    Raises ValueError for unknown fields.
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.__fields__]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys([*always, *requested]))
+
+
+def rows_to_dicts(rows: Iterable[Any], keys: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Project result rows (from a column select) to plain dicts,
+    optionally keeping only `keys`.
+    """
+    if keys is None:
+        return [dict(row._mapping) for row in rows]
+    keys = list(keys)
+    return [{key: row._mapping[key] for key in keys} for row in rows]
+
+
+def fast_json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """
+    Serialize trusted projections with orjson. Returning a Response makes
+    FastAPI skip response_model validation; the declared response_model
+    still documents the shape in OpenAPI.
+    """
+    return FastJSONResponse(content, headers=headers)
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
@@ -12,6 +12,13 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so user input is matched literally.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -27,11 +34,15 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return result.scalars().first()
 
     async def get_multi(
-        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, columns: Optional[Sequence[Any]] = None
     ) -> List[ModelType]:
         """
         Get multiple records.
+        With `columns`, returns rows of just those columns instead of entities.
         """
+        if columns:
+            result = await db.execute(select(*columns).offset(skip).limit(limit))
+            return result.all()
         result = await db.execute(select(self.model).offset(skip).limit(limit))
         return result.scalars().all()
 
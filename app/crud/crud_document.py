@@ -1,11 +1,43 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy import select, update, and_, or_, desc, asc
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from sqlalchemy import select, insert, update, and_, or_, desc, asc, tuple_, literal, func, Select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.base import CRUDBase
-from app.models.document import Document, DocumentVersion, DocumentAccess
+from app.core.pagination import decode_cursor, cursor_for, cursor_value
+from app.crud.base import CRUDBase, escape_like
+from app.models.document import Document, DocumentVersion, DocumentAccess, SEARCH_CONFIG
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentListFilter, DocumentVersionCreate
 
+# Columns that can be used for ordering and keyset pagination
+SORTABLE_FIELDS = ("created_at", "updated_at", "title", "id")
+
+# Version columns copied from DocumentVersionCreate
+VERSION_FIELDS = ("filename", "content_type", "file_size", "storage_path", "nonce", "file_hash")
+
+
+def next_version_id():
+    """
+    Draw a document_versions id up front, so the document row can point at
+    its new version in the same statement that writes it.
+    """
+    return func.nextval(func.pg_get_serial_sequence(DocumentVersion.__tablename__, "id"))
+
+
+def version_values(version_in: DocumentVersionCreate) -> Dict[str, Any]:
+    return {field: getattr(version_in, field) for field in VERSION_FIELDS}
+
+
+def current_version_values(version_in: DocumentVersionCreate) -> Dict[str, Any]:
+    """
+    The documents.current_* summary of a new current version.
+    """
+    return {
+        "current_file_size": version_in.file_size,
+        "current_file_hash": version_in.file_hash,
+        "current_storage_path": version_in.storage_path,
+        "current_nonce": version_in.nonce,
+    }
+
 
 class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
     async def create_with_version(
@@ -18,39 +50,36 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
     ) -> Document:
         """
         Create a document with its first version.
+        Two statements: the document row (RETURNING it, with the version id
+        already drawn from the sequence), then the version row.
         """
-        db_obj = Document(
-            title=obj_in.title,
-            description=obj_in.description,
-            filename=obj_in.filename,
-            content_type=obj_in.content_type,
-            creator_id=creator_id
+        result = await db.execute(
+            insert(Document)
+            .values(
+                title=obj_in.title,
+                description=obj_in.description,
+                filename=obj_in.filename,
+                content_type=obj_in.content_type,
+                creator_id=creator_id,
+                current_version_id=next_version_id(),
+                last_version_number=1,
+                **current_version_values(version_in)
+            )
+            .returning(Document)
+        )
+        document = result.scalars().one()
+        await db.execute(
+            insert(DocumentVersion).values(
+                **version_values(version_in),
+                id=document.current_version_id,
+                document_id=document.id,
+                user_id=creator_id,
+                version_number=1,
+                prev_hash=None
+            )
         )
-        db.add(db_obj)
-        await db.flush()
-        
-        # Create first version
-        version_obj = DocumentVersion(
-            document_id=db_obj.id,
-            user_id=creator_id,
-            version_number=1,
-            filename=version_in.filename,
-            content_type=version_in.content_type,
-            file_size=version_in.file_size,
-            storage_path=version_in.storage_path,
-            nonce=version_in.nonce,
-            file_hash=version_in.file_hash,
-            prev_hash=version_in.prev_hash,
-        )
-        db.add(version_obj)
-        await db.flush()
-        
-        # Update document with current version id
-        db_obj.current_version_id = version_obj.id
         await db.commit()
-        await db.refresh(db_obj)
-        
-        return db_obj
+        return document
     
     async def add_version(
         self,
@@ -59,50 +88,119 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
         document_id: int,
         version_in: DocumentVersionCreate,
         user_id: int
-    ) -> Document:
+    ) -> Optional[Document]:
         """
         Add a new version to an existing document.
+        Two statements: the document row is updated first (next number, new
+        current version id) and its lock, held until commit, serializes
+        concurrent uploads; the version row then links prev_hash to the
+        previous version in SQL.
         """
-        # Get document
-        document = await self.get(db, id=document_id)
-        if not document:
+        result = await db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(
+                last_version_number=Document.last_version_number + 1,
+                current_version_id=next_version_id(),
+                filename=version_in.filename,
+                content_type=version_in.content_type,
+                **current_version_values(version_in)
+            )
+            .returning(Document),
+            execution_options={"populate_existing": True}
+        )
+        document = result.scalars().one_or_none()
+        if document is None:
             return None
         
-        # Get latest version number
+        previous_hash = (
+            select(DocumentVersion.file_hash)
+            .where(
+                DocumentVersion.document_id == document_id,
+                DocumentVersion.version_number == document.last_version_number - 1
+            )
+            .scalar_subquery()
+        )
+        await db.execute(
+            insert(DocumentVersion).values(
+                **version_values(version_in),
+                id=document.current_version_id,
+                document_id=document_id,
+                user_id=user_id,
+                version_number=document.last_version_number,
+                prev_hash=previous_hash
+            )
+        )
+        await db.commit()
+        return document
+    
+    async def update_fields(
+        self,
+        db: AsyncSession,
+        *,
+        document_id: int,
+        values: Dict[str, Any]
+    ) -> Optional[Document]:
+        """
+        Update document columns with a single UPDATE ... RETURNING.
+        """
         result = await db.execute(
-            select(DocumentVersion.version_number)
-            .filter(DocumentVersion.document_id == document_id)
-            .order_by(desc(DocumentVersion.version_number))
-            .limit(1)
+            update(Document)
+            .where(Document.id == document_id)
+            .values(**values)
+            .returning(Document),
+            execution_options={"populate_existing": True}
         )
-        latest_version = result.scalar_one_or_none() or 0
-        
-        # Create new version
-        version_obj = DocumentVersion(
-            document_id=document_id,
-            user_id=user_id,
-            version_number=latest_version + 1,
-            filename=version_in.filename,
-            content_type=version_in.content_type,
-            file_size=version_in.file_size,
-            storage_path=version_in.storage_path,
-            nonce=version_in.nonce,
-            file_hash=version_in.file_hash,
-            prev_hash=version_in.prev_hash,
-        )
-        db.add(version_obj)
-        await db.flush()
-        
-        # Update document with current version id
-        document.current_version_id = version_obj.id
-        document.filename = version_in.filename
-        document.content_type = version_in.content_type
-        
+        document = result.scalars().one_or_none()
         await db.commit()
-        await db.refresh(document)
-        
         return document
     
+    async def get_with_access(
+        self,
+        db: AsyncSession,
+        *,
+        document_id: int,
+        user_id: int
+    ) -> Optional[Tuple[Document, Optional[str]]]:
+        """
+        Get a document together with the user's ACL access level in one query.
+        The access level is None when the document is not shared with the user.
+        """
+        access_level = (
+            select(DocumentAccess.access_level)
+            .where(DocumentAccess.document_id == Document.id, DocumentAccess.user_id == user_id)
+            # At most one grant per (document, user): uq_document_access_document_id_user_id
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(Document, access_level).filter(Document.id == document_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return row[0], row[1]
+
+    async def get_many_with_access(
+        self,
+        db: AsyncSession,
+        *,
+        document_ids: Sequence[int],
+        user_id: int
+    ) -> Dict[int, Tuple[Document, Optional[str]]]:
+        """
+        Like get_with_access for several documents, in one IN query.
+        Ids that do not exist are missing from the result.
+        """
+        access_level = (
+            select(DocumentAccess.access_level)
+            .where(DocumentAccess.document_id == Document.id, DocumentAccess.user_id == user_id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(Document, access_level).filter(Document.id.in_(document_ids))
+        )
+        return {row[0].id: (row[0], row[1]) for row in result.all()}
+
     async def get_with_versions(
         self,
         db: AsyncSession,
@@ -131,6 +229,22 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
             "versions": versions
         }
     
+    async def get_hash_chain(
+        self,
+        db: AsyncSession,
+        *,
+        document_id: int
+    ) -> Sequence[Any]:
+        """
+        (version_number, file_hash, prev_hash) of every version, oldest first.
+        """
+        result = await db.execute(
+            select(DocumentVersion.version_number, DocumentVersion.file_hash, DocumentVersion.prev_hash)
+            .where(DocumentVersion.document_id == document_id)
+            .order_by(asc(DocumentVersion.version_number))
+        )
+        return result.all()
+
     async def get_version(
         self,
         db: AsyncSession,
@@ -142,6 +256,45 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
         """
         result = await db.execute(select(DocumentVersion).filter(DocumentVersion.id == version_id))
         return result.scalars().first()
+
+    async def get_version_by_number(
+        self,
+        db: AsyncSession,
+        *,
+        document_id: int,
+        version_number: int
+    ) -> Optional[DocumentVersion]:
+        """
+        Get a version by its number, via the (document_id, version_number) unique index.
+        """
+        result = await db.execute(
+            select(DocumentVersion).filter(
+                DocumentVersion.document_id == document_id,
+                DocumentVersion.version_number == version_number
+            )
+        )
+        return result.scalars().first()
+
+    async def list_versions(
+        self,
+        db: AsyncSession,
+        *,
+        document_id: int,
+        columns: Sequence[Any],
+        before: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Any]:
+        """
+        Versions of a document, newest first, as rows of `columns`.
+        `before` is a version number to continue from (keyset on the unique index).
+        """
+        query = select(*columns).filter(DocumentVersion.document_id == document_id)
+        if before is not None:
+            query = query.filter(DocumentVersion.version_number < before)
+        result = await db.execute(
+            query.order_by(desc(DocumentVersion.version_number)).limit(limit)
+        )
+        return result.all()
     
     async def search_documents(
         self,
@@ -150,12 +303,108 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
         filters: DocumentListFilter,
         user_id: int,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[Document]:
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence[Any]] = None
+    ) -> Dict[str, Any]:
         """
         Search for documents based on filters.
+        Pages by (sort_by, id) keyset when a cursor is given, by offset otherwise.
+        Returns the page items together with next/prev cursors.
+        With `columns` the items are rows of just those columns instead of
+        Document entities; they must include id and the sort column.
         """
-        query = select(Document).filter(
+        if filters.sort_by not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by '{filters.sort_by}'")
+        sort_order = "asc" if filters.sort_order.lower() == "asc" else "desc"
+
+        query = (select(*columns) if columns else select(Document)).filter(
+            *self._list_conditions(filters, user_id)
+        )
+
+        if filters.q:
+            return await self._search_ranked(
+                db, query=query, text=filters.q, skip=skip, limit=limit, cursor=cursor, rows=bool(columns)
+            )
+
+        return await self.paginate(
+            db,
+            query=query,
+            sort_by=filters.sort_by,
+            sort_order=sort_order,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            rows=bool(columns)
+        )
+
+    async def paginate(
+        self,
+        db: AsyncSession,
+        *,
+        query: Select,
+        sort_by: str,
+        sort_order: str,
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        cursor: Optional[str] = None,
+        rows: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Run a documents query one page at a time, by (sort_by, id) keyset when
+        a cursor is given and by offset otherwise.
+        Returns the page items together with next/prev cursors.
+        limit=None returns everything after the cursor/offset in one page.
+        """
+        sort_column = getattr(Document, sort_by)
+        direction = "next"
+        if cursor:
+            position = decode_cursor(cursor)
+            if position["sort_by"] != sort_by or position["sort_order"] != sort_order:
+                raise ValueError("Cursor does not match the requested sorting")
+            direction = position["direction"]
+            # Walking backwards flips the comparison and the ordering
+            forward = (sort_order == "asc") == (direction == "next")
+            key = tuple_(sort_column, Document.id)
+            value = cursor_value(position["value"], sort_column.type.python_type)
+            bound = tuple_(literal(value, sort_column.type), literal(cursor_value(position["id"], int)))
+            query = query.filter(key > bound if forward else key < bound)
+        else:
+            forward = sort_order == "asc"
+
+        # Apply sorting, id is the tie-breaker so the order is total
+        if forward:
+            query = query.order_by(asc(sort_column), asc(Document.id))
+        else:
+            query = query.order_by(desc(sort_column), desc(Document.id))
+
+        # Apply pagination, one extra row tells whether there is another page
+        if not cursor:
+            query = query.offset(skip)
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        result = await db.execute(query)
+        items = list(result.all() if rows else result.scalars().all())
+        has_more = limit is not None and len(items) > limit
+        items = items[:limit]
+        if direction == "prev":
+            items.reverse()
+
+        has_next = has_more if direction == "next" else bool(cursor)
+        has_prev = has_more if direction == "prev" else bool(cursor) or skip > 0
+        return {
+            "items": items,
+            "next_cursor": cursor_for(items[-1], sort_by, sort_order) if has_next and items else None,
+            "prev_cursor": cursor_for(items[0], sort_by, sort_order, "prev") if has_prev and items else None,
+        }
+    
+    def _list_conditions(self, filters: DocumentListFilter, user_id: int) -> List[Any]:
+        """
+        WHERE conditions shared by search_documents and list_fingerprint
+        (full-text matching is applied separately).
+        """
+        conditions = [
             or_(
                 Document.creator_id == user_id,
                 Document.id.in_(
@@ -163,27 +412,78 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
                     .where(DocumentAccess.user_id == user_id)
                 )
             )
-        )
-        
-        # Apply filters
+        ]
+        # Substring match, served by the pg_trgm GIN index on title
         if filters.title:
-            query = query.filter(Document.title.ilike(f"%{filters.title}%"))
-        
+            conditions.append(Document.title.ilike(f"%{escape_like(filters.title)}%", escape="\\"))
         if filters.creator_id:
-            query = query.filter(Document.creator_id == filters.creator_id)
-        
-        # Apply sorting
-        if filters.sort_order.lower() == "asc":
-            query = query.order_by(asc(getattr(Document, filters.sort_by)))
-        else:
-            query = query.order_by(desc(getattr(Document, filters.sort_by)))
-        
-        # Apply pagination
-        query = query.offset(skip).limit(limit)
-        
+            conditions.append(Document.creator_id == filters.creator_id)
+        return conditions
+
+    async def list_fingerprint(
+        self,
+        db: AsyncSession,
+        *,
+        filters: DocumentListFilter,
+        user_id: int
+    ) -> Tuple[int, Optional[datetime], int, Optional[int]]:
+        """
+        Row count and latest updated_at of everything search_documents can
+        return for these filters, plus count and max(id) of the user's grants
+        so that sharing and revoking change it too; used to build list ETags.
+        updated_at is the writing transaction's start time: a transaction that
+        started before the newest visible change and commits after it, without
+        changing the count, goes unnoticed until the next change in scope.
+        """
+        grants = DocumentAccess.user_id == user_id
+        query = select(
+            func.count(),
+            func.max(Document.updated_at),
+            select(func.count(DocumentAccess.id)).where(grants).scalar_subquery(),
+            select(func.max(DocumentAccess.id)).where(grants).scalar_subquery()
+        ).filter(
+            *self._list_conditions(filters, user_id)
+        )
+        if filters.q:
+            query = query.filter(
+                Document.search_vector.op("@@")(func.websearch_to_tsquery(SEARCH_CONFIG, filters.q))
+            )
         result = await db.execute(query)
-        return result.scalars().all()
-    
+        count, last_updated, grant_count, last_grant = result.one()
+        return count, last_updated, grant_count, last_grant
+
+    async def _search_ranked(
+        self,
+        db: AsyncSession,
+        *,
+        query: Select,
+        text: str,
+        skip: int,
+        limit: int,
+        cursor: Optional[str],
+        rows: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Full-text match over title, description and extracted content,
+        ordered by relevance. Ranked results are paged by offset only.
+        """
+        if cursor:
+            raise ValueError("Cursor pagination is not available for full-text search")
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        rank = func.ts_rank_cd(Document.search_vector, ts_query)
+        query = (
+            query.filter(Document.search_vector.op("@@")(ts_query))
+            .order_by(desc(rank), desc(Document.id))
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return {
+            "items": result.all() if rows else result.scalars().all(),
+            "next_cursor": None,
+            "prev_cursor": None,
+        }
+
     async def mark_as_deleted(
         self,
         db: AsyncSession,
@@ -193,15 +493,7 @@ class CRUDDocument(CRUDBase[Document, DocumentCreate, DocumentUpdate]):
         """
         Mark a document as deleted (soft delete).
         """
-        document = await self.get(db, id=document_id)
-        if not document:
-            return None
-        
-        document.is_deleted = True
-        db.add(document)
-        await db.commit()
-        await db.refresh(document)
-        return document
+        return await self.update_fields(db, document_id=document_id, values={"is_deleted": True})
 
 
 document_crud = CRUDDocument(Document)
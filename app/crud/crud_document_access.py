@@ -1,8 +1,10 @@
-from typing import List, Any, Coroutine, Sequence
+from typing import List, Any, Coroutine, Dict, Optional, Sequence, Tuple
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import Integer, column, select, delete, exists, tuple_, values
 
+from app.crud.crud_document import document_crud, SORTABLE_FIELDS
 from app.models.document import DocumentAccess, Document
 from app.schemas.document import DocumentAccessCreate
 
@@ -10,15 +12,50 @@ class CRUDDocumentAccess:
     async def grant_access(
         self, db: AsyncSession, *, document_id: int, user_id: int, access_level: str
     ) -> DocumentAccess:
-        access = DocumentAccess(
-            document_id=document_id,
-            user_id=user_id,
-            access_level=access_level
+        """
+        Grant a user access to a document, or change the level of an existing grant.
+        """
+        granted = await self.grant_access_bulk(db, grants=[(document_id, user_id, access_level)])
+        return granted[0]
+
+    async def grant_access_bulk(
+        self, db: AsyncSession, *, grants: Sequence[Tuple[int, int, str]]
+    ) -> List[DocumentAccess]:
+        """
+        Grant (document_id, user_id, access_level) triples with one
+        INSERT ... ON CONFLICT DO UPDATE, in one transaction.
+        Existing grants for the same document and user get the new level;
+        grants that already have it are not written, so they fire no change
+        triggers or events, and are read back for the result instead.
+        """
+        # A statement may update each row only once: the last grant of a pair wins
+        rows = {
+            (document_id, user_id): {"document_id": document_id, "user_id": user_id, "access_level": access_level}
+            for document_id, user_id, access_level in grants
+        }
+        if not rows:
+            return []
+        stmt = insert(DocumentAccess).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DocumentAccess.document_id, DocumentAccess.user_id],
+            set_={"access_level": stmt.excluded.access_level},
+            where=DocumentAccess.access_level.is_distinct_from(stmt.excluded.access_level)
         )
-        db.add(access)
+        result = await db.execute(
+            stmt.returning(DocumentAccess),
+            execution_options={"populate_existing": True}
+        )
+        granted = list(result.scalars().all())
+        unchanged = set(rows) - {(access.document_id, access.user_id) for access in granted}
+        if unchanged:
+            result = await db.execute(
+                select(DocumentAccess).where(
+                    tuple_(DocumentAccess.document_id, DocumentAccess.user_id).in_(list(unchanged))
+                )
+            )
+            granted.extend(result.scalars().all())
         await db.commit()
-        await db.refresh(access)
-        return access
+        return granted
 
     async def revoke_access(
         self, db: AsyncSession, *, document_id: int, user_id: int
@@ -30,24 +67,64 @@ class CRUDDocumentAccess:
         )
         await db.commit()
 
-    async def get_user_accessible_documents(
-            self, db: AsyncSession, user_id: int
-    ) -> list[Any] | Sequence[Document]:
-        # Получаем все записи доступа пользователя
+    async def revoke_access_bulk(
+        self, db: AsyncSession, *, grants: Sequence[Tuple[int, int]]
+    ) -> int:
+        """
+        Revoke (document_id, user_id) pairs with a single DELETE ... USING (VALUES ...).
+        Returns the number of grants removed.
+        """
+        pairs = list(dict.fromkeys(grants))
+        if not pairs:
+            return 0
+        revoked = values(
+            column("document_id", Integer), column("user_id", Integer), name="revoked"
+        ).data(pairs)
         result = await db.execute(
-            select(DocumentAccess.document_id)
-            .filter(DocumentAccess.user_id == user_id)
+            delete(DocumentAccess).where(
+                DocumentAccess.document_id == revoked.c.document_id,
+                DocumentAccess.user_id == revoked.c.user_id
+            ),
+            execution_options={"synchronize_session": False}
         )
-        document_ids = result.scalars().all()
+        await db.commit()
+        return result.rowcount
 
-        # Получаем документы по найденным ID
-        if not document_ids:
-            return []
+    async def get_user_accessible_documents(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        sort_by: str = "updated_at",
+        sort_order: str = "desc",
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        cursor: Optional[str] = None,
+        columns: Optional[Sequence[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of the documents shared with the user, deleted ones excluded.
+        A single query: the grants are semi-joined and paging is by keyset,
+        see document_crud.paginate (limit=None returns them all).
+        With `columns` the items are rows; they must include id and the sort column.
+        """
+        if sort_by not in SORTABLE_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort_by}'")
+        sort_order = "asc" if sort_order.lower() == "asc" else "desc"
 
-        result = await db.execute(
-            select(Document)
-            .filter(Document.id.in_(document_ids))
+        query = (select(*columns) if columns else select(Document)).where(
+            exists().where(DocumentAccess.document_id == Document.id, DocumentAccess.user_id == user_id),
+            Document.is_deleted.isnot(True)
+        )
+        return await document_crud.paginate(
+            db,
+            query=query,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            rows=bool(columns)
         )
-        return result.scalars().all()
 
 document_access_crud = CRUDDocumentAccess()
\ No newline at end of file
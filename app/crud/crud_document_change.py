@@ -0,0 +1,220 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import BigInteger, select, and_, or_, func, literal, tuple_, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import (
+    encode_change_cursor, decode_change_cursor, encode_snapshot_cursor, decode_snapshot_cursor, ChangeCursorExpired
+)
+from app.models.document import Document, DocumentVersion, DocumentAccess
+from app.models.document_change import DocumentChange, DocumentChangeHorizon
+
+
+class CRUDDocumentChange:
+    async def get_changes(
+        self, db: AsyncSession, *, user_id: int, since: Optional[str] = None, limit: int = 500
+    ) -> Dict[str, Any]:
+        """
+        Changes to documents the user owns or has been granted since the cursor.
+        Documents, versions and ACL entries are returned in their current state;
+        removed or no longer accessible ones are listed by id. Without a cursor
+        a full sync starts, see _get_snapshot. Raises ChangeCursorExpired when
+        retention has deleted entries after the cursor.
+        """
+        # Transactions older than xmin have all finished, so nothing can be
+        # committed behind the returned cursor later on
+        xmin, horizon_txid, horizon_id = (await db.execute(
+            select(
+                func.txid_snapshot_xmin(func.txid_current_snapshot()),
+                select(DocumentChangeHorizon.txid).scalar_subquery(),
+                select(DocumentChangeHorizon.change_id).scalar_subquery()
+            )
+        )).one()
+
+        snapshot = decode_snapshot_cursor(since) if since else (xmin, 0)
+        if snapshot is not None:
+            return await self._get_snapshot(db, user_id=user_id, xmin=snapshot[0], after_id=snapshot[1], limit=limit)
+
+        txid, last_id = decode_change_cursor(since)
+        if horizon_txid is not None and (txid, last_id) < (horizon_txid, horizon_id):
+            raise ChangeCursorExpired("Cursor is older than the change log, sync again without 'since'")
+
+        owned = select(Document.id).where(Document.creator_id == user_id)
+        shared = select(DocumentAccess.document_id).where(DocumentAccess.user_id == user_id)
+        result = await db.execute(
+            select(DocumentChange)
+            .where(
+                tuple_(DocumentChange.txid, DocumentChange.id) > tuple_(
+                    literal(txid, BigInteger), literal(last_id, BigInteger)
+                ),
+                DocumentChange.txid < xmin,
+                or_(
+                    DocumentChange.document_id.in_(owned),
+                    DocumentChange.document_id.in_(shared),
+                    # Revocations, the grant row no longer points to an accessible document
+                    and_(DocumentChange.entity == "access", DocumentChange.user_id == user_id),
+                )
+            )
+            .order_by(DocumentChange.txid, DocumentChange.id)
+            .limit(limit + 1)
+        )
+        changes = result.scalars().all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        if has_more:
+            cursor = encode_change_cursor(changes[-1].txid, changes[-1].id)
+        else:
+            cursor = encode_change_cursor(*max((txid, last_id), (xmin, 0)))
+
+        page = {
+            "cursor": cursor,
+            "has_more": has_more,
+            "documents": [],
+            "versions": [],
+            "access": [],
+            "deleted_documents": [],
+            "deleted_access": [],
+        }
+        if not changes:
+            return page
+
+        document_ids = {c.document_id for c in changes}
+        version_ids = {c.entity_id for c in changes if c.entity == "version"}
+        access_ids = {c.entity_id for c in changes if c.entity == "access"}
+
+        result = await db.execute(
+            select(Document).where(
+                Document.id.in_(document_ids),
+                Document.is_deleted.isnot(True),
+                or_(Document.creator_id == user_id, Document.id.in_(shared))
+            )
+        )
+        page["documents"] = result.scalars().all()
+        visible_ids = {d.id for d in page["documents"]}
+        page["deleted_documents"] = sorted(document_ids - visible_ids)
+
+        if version_ids and visible_ids:
+            result = await db.execute(
+                select(DocumentVersion).where(
+                    DocumentVersion.id.in_(version_ids),
+                    DocumentVersion.document_id.in_(visible_ids)
+                )
+            )
+            page["versions"] = result.scalars().all()
+
+        if access_ids:
+            # Owners see every grant on their documents, grantees only their own
+            result = await db.execute(
+                select(DocumentAccess)
+                .join(Document, Document.id == DocumentAccess.document_id)
+                .where(
+                    DocumentAccess.id.in_(access_ids),
+                    or_(Document.creator_id == user_id, DocumentAccess.user_id == user_id)
+                )
+            )
+            page["access"] = result.scalars().all()
+            page["deleted_access"] = sorted(
+                c.entity_id for c in changes
+                if c.entity == "access" and c.action == "deleted"
+            )
+        return page
+
+    async def _get_snapshot(
+        self, db: AsyncSession, *, user_id: int, xmin: int, after_id: int, limit: int
+    ) -> Dict[str, Any]:
+        """
+        One page of a full sync: up to `limit` of the user's documents in id
+        order with all their versions and visible grants, read from the tables
+        since old log entries are deleted. After the last page the cursor
+        continues in the change log at `xmin`, the transaction horizon when the
+        sync started, so changes made during the sync are replayed from there.
+        """
+        shared = select(DocumentAccess.document_id).where(DocumentAccess.user_id == user_id)
+        result = await db.execute(
+            select(Document)
+            .where(
+                Document.id > after_id,
+                Document.is_deleted.isnot(True),
+                or_(Document.creator_id == user_id, Document.id.in_(shared))
+            )
+            .order_by(Document.id)
+            .limit(limit + 1)
+        )
+        documents = result.scalars().all()
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+
+        page = {
+            "cursor": encode_snapshot_cursor(xmin, documents[-1].id) if has_more else encode_change_cursor(xmin, 0),
+            "has_more": has_more,
+            "documents": documents,
+            "versions": [],
+            "access": [],
+            "deleted_documents": [],
+            "deleted_access": [],
+        }
+        if not documents:
+            return page
+
+        document_ids = [d.id for d in documents]
+        result = await db.execute(
+            select(DocumentVersion)
+            .where(DocumentVersion.document_id.in_(document_ids))
+            .order_by(DocumentVersion.id)
+        )
+        page["versions"] = result.scalars().all()
+        # Owners see every grant on their documents, grantees only their own
+        result = await db.execute(
+            select(DocumentAccess)
+            .join(Document, Document.id == DocumentAccess.document_id)
+            .where(
+                DocumentAccess.document_id.in_(document_ids),
+                or_(Document.creator_id == user_id, DocumentAccess.user_id == user_id)
+            )
+            .order_by(DocumentAccess.id)
+        )
+        page["access"] = result.scalars().all()
+        return page
+
+    async def delete_expired(
+        self, db: AsyncSession, *, before: datetime, batch_size: int = 1000
+    ) -> int:
+        """
+        Delete one batch of log entries created before `before`, oldest
+        position first, returns the number deleted. The newest deleted
+        position is kept in document_change_horizon for get_changes.
+        Batches are locked with SKIP LOCKED so concurrent workers do not collide.
+        """
+        batch = (
+            select(DocumentChange.id)
+            .where(DocumentChange.created_at < before)
+            .order_by(DocumentChange.txid, DocumentChange.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(DocumentChange)
+            .where(DocumentChange.id.in_(batch.scalar_subquery()))
+            .returning(DocumentChange.txid, DocumentChange.id),
+            execution_options={"synchronize_session": False}
+        )
+        deleted = result.all()
+        if deleted:
+            txid, change_id = max(tuple(row) for row in deleted)
+            stmt = insert(DocumentChangeHorizon).values(id=1, txid=txid, change_id=change_id)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DocumentChangeHorizon.id],
+                set_={"txid": stmt.excluded.txid, "change_id": stmt.excluded.change_id, "updated_at": func.now()},
+                # Concurrent batches may finish out of order; the horizon only moves forward
+                where=tuple_(DocumentChangeHorizon.txid, DocumentChangeHorizon.change_id)
+                < tuple_(stmt.excluded.txid, stmt.excluded.change_id)
+            )
+            await db.execute(stmt)
+        await db.commit()
+        return len(deleted)
+
+
+document_change_crud = CRUDDocumentChange()
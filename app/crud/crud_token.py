@@ -1,11 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, literal, or_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
 from app.core.config import settings
+from app.core.security import hash_token
 from app.models.token import RefreshToken
 
 
@@ -14,11 +16,11 @@ class CRUDToken(CRUDBase[RefreshToken, None, None]):
         self, db: AsyncSession, *, token: str
     ) -> Optional[RefreshToken]:
         """
-        Get a refresh token by its value.
+        Get a valid refresh token by its value.
         """
         result = await db.execute(
             select(RefreshToken).filter(
-                RefreshToken.token == token,
+                RefreshToken.token_hash == hash_token(token),
                 RefreshToken.is_valid == True,
                 RefreshToken.expires_at > datetime.utcnow()
             )
@@ -33,7 +35,7 @@ class CRUDToken(CRUDBase[RefreshToken, None, None]):
         """
         expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         db_obj = RefreshToken(
-            token=refresh_token,
+            token_hash=hash_token(refresh_token),
             user_id=user_id,
             expires_at=expires_at,
             is_valid=True
@@ -52,7 +54,7 @@ class CRUDToken(CRUDBase[RefreshToken, None, None]):
         result = await db.execute(
             update(RefreshToken)
             .where(
-                RefreshToken.token == refresh_token,
+                RefreshToken.token_hash == hash_token(refresh_token),
                 RefreshToken.user_id == user_id,
                 RefreshToken.is_valid == True
             )
@@ -65,13 +67,42 @@ class CRUDToken(CRUDBase[RefreshToken, None, None]):
         self, db: AsyncSession, *, user_id: int, old_refresh_token: str, new_refresh_token: str
     ) -> Optional[RefreshToken]:
         """
-        Invalidate old refresh token and create a new one.
+        Invalidate old refresh token and create a new one in a single statement.
+        Returns None if the old token was not valid (expired, revoked or already
+        rotated by a concurrent request); nothing is inserted in that case.
         """
-        # Invalidate old token
-        await self.invalidate_refresh_token(db, user_id=user_id, refresh_token=old_refresh_token)
-        
-        # Create new token
-        return await self.create_refresh_token(db, user_id=user_id, refresh_token=new_refresh_token)
+        expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        # WITH old AS (UPDATE ... SET is_valid = false WHERE ... RETURNING user_id)
+        # INSERT INTO refresh_tokens (...) SELECT ... FROM old RETURNING ...
+        old = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == hash_token(old_refresh_token),
+                RefreshToken.user_id == user_id,
+                RefreshToken.is_valid == True,
+                RefreshToken.expires_at > datetime.utcnow()
+            )
+            .values(is_valid=False)
+            .returning(RefreshToken.user_id)
+            .cte("old")
+        )
+        stmt = (
+            insert(RefreshToken)
+            .from_select(
+                ["token_hash", "user_id", "is_valid", "expires_at"],
+                select(
+                    literal(hash_token(new_refresh_token)),
+                    old.c.user_id,
+                    literal(True),
+                    literal(expires_at, RefreshToken.expires_at.type),
+                ),
+            )
+            .returning(RefreshToken)
+        )
+        result = await db.execute(stmt)
+        db_obj = result.scalars().first()
+        await db.commit()
+        return db_obj
     
     async def invalidate_all_user_tokens(
         self, db: AsyncSession, *, user_id: int
@@ -90,5 +121,29 @@ class CRUDToken(CRUDBase[RefreshToken, None, None]):
         await db.commit()
         return result.rowcount > 0
 
+    async def delete_stale(
+        self, db: AsyncSession, *, batch_size: int = 1000
+    ) -> int:
+        """
+        Delete one batch of expired or invalidated tokens, returns the number deleted.
+        Batches are locked with SKIP LOCKED so concurrent workers do not collide.
+        """
+        batch = (
+            select(RefreshToken.id)
+            .where(
+                or_(
+                    RefreshToken.expires_at < datetime.utcnow(),
+                    RefreshToken.is_valid == False
+                )
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(batch.scalar_subquery()))
+        )
+        await db.commit()
+        return result.rowcount
+
 
 token_crud = CRUDToken(RefreshToken)
@@ -1,11 +1,13 @@
-from typing import Any, Dict, Optional, Union
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import select, or_, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
-from app.crud.base import CRUDBase
-from app.models.user import User
+from app.core.security import get_password_hash_async, verify_password_async
+from app.crud.base import CRUDBase, escape_like
+from app.models.user import User, RevokedUser
 from app.schemas.user import UserCreate, UserUpdate
 
 
@@ -17,13 +19,64 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = await db.execute(select(User).filter(User.email == email))
         return result.scalars().first()
 
+    async def get_missing_ids(self, db: AsyncSession, *, ids: Sequence[int]) -> List[int]:
+        """
+        The ids, in request order, that belong to no user.
+        """
+        wanted = list(dict.fromkeys(ids))
+        if not wanted:
+            return []
+        result = await db.execute(select(User.id).filter(User.id.in_(wanted)))
+        found = set(result.scalars().all())
+        return [user_id for user_id in wanted if user_id not in found]
+
+    async def search(
+        self, db: AsyncSession, *, query: str, skip: int = 0, limit: int = 100,
+        columns: Optional[Sequence[Any]] = None
+    ) -> List[User]:
+        """
+        Search users by a fragment of their email or full name.
+        Both columns have pg_trgm GIN indexes, so the ILIKE does not scan the table.
+        With `columns`, returns rows of just those columns instead of entities.
+        """
+        similarity = func.greatest(
+            func.similarity(User.email, query),
+            func.coalesce(func.similarity(User.full_name, query), 0)
+        )
+        result = await db.execute(
+            (select(*columns) if columns else select(User))
+            .filter(self._search_condition(query))
+            .order_by(desc(similarity), User.id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.all() if columns else result.scalars().all()
+
+    def _search_condition(self, query: str) -> Any:
+        pattern = f"%{escape_like(query)}%"
+        return or_(User.email.ilike(pattern, escape="\\"), User.full_name.ilike(pattern, escape="\\"))
+
+    async def list_fingerprint(
+        self, db: AsyncSession, *, query: Optional[str] = None
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        Row count and latest updated_at of the users a listing or search
+        can return; used to build list ETags.
+        """
+        stmt = select(func.count(), func.max(User.updated_at))
+        if query:
+            stmt = stmt.filter(self._search_condition(query))
+        result = await db.execute(stmt)
+        count, last_updated = result.one()
+        return count, last_updated
+
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         """
         Create a new user.
         """
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await get_password_hash_async(obj_in.password),
             full_name=obj_in.full_name,
             role=obj_in.role,
             is_active=obj_in.is_active
@@ -44,11 +97,40 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await get_password_hash_async(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
+        # A role or activity change revokes access tokens carrying the old claims
+        if any(
+            field in update_data and update_data[field] != getattr(db_obj, field)
+            for field in ("role", "is_active")
+        ):
+            update_data["perm_version"] = (db_obj.perm_version or 0) + 1
         return await super().update(db, db_obj=db_obj, obj_in=update_data)
 
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[User]:
+        """
+        Delete a user and record the revocation of their tokens in the same transaction.
+        """
+        user = await db.get(User, id)
+        if user is None:
+            return None
+        await db.delete(user)
+        await db.execute(
+            pg_insert(RevokedUser)
+            .values(user_id=id)
+            .on_conflict_do_update(index_elements=[RevokedUser.user_id], set_={"revoked_at": func.now()})
+        )
+        await db.commit()
+        return user
+
+    async def get_revoked_ids(self, db: AsyncSession, *, since: datetime) -> List[int]:
+        """
+        Ids of users deleted after `since`.
+        """
+        result = await db.execute(select(RevokedUser.user_id).filter(RevokedUser.revoked_at > since))
+        return result.scalars().all()
+
     async def authenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
         """
         Authenticate a user by email and password.
@@ -56,8 +138,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        is_valid, new_hash = await verify_password_async(password, user.hashed_password)
+        if not is_valid:
             return None
+        # Transparently upgrade hashes made with an old cost or scheme
+        if new_hash:
+            user.hashed_password = new_hash
+            db.add(user)
+            await db.commit()
         return user
 
 
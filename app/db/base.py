@@ -1,10 +1,8 @@
-from sqlalchemy.ext.asyncio import AsyncAttrs
-from sqlalchemy.orm import DeclarativeBase
-
-class Base(AsyncAttrs, DeclarativeBase):
-    pass
+from app.db.base_class import Base
 
 # Import all models here for Alembic autogenerate to work
-from app.models.user import User
+from app.models.user import User, RevokedUser
 from app.models.document import Document, DocumentVersion
+from app.models.document_change import DocumentChange, DocumentChangeHorizon
 from app.models.token import RefreshToken
+from app.models.totp import TOTPSecret
@@ -0,0 +1,9 @@
+from sqlalchemy import DDL, event
+from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.orm import DeclarativeBase
+
+class Base(AsyncAttrs, DeclarativeBase):
+    pass
+
+# pg_trgm backs the substring-search indexes on documents and users
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
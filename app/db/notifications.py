@@ -0,0 +1,93 @@
+import asyncio
+import inspect
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How often the listener checks its connection and reconnects if needed
+RECONNECT_INTERVAL = 5
+
+
+class PgListener:
+    """
+    Fans Postgres NOTIFY messages out to in-process callbacks.
+    Holds one dedicated connection per worker; callbacks receive the payload.
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._reconnect_callbacks: List[Callable[[], Any]] = []
+        self._engine: Optional[AsyncEngine] = None
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._callbacks[channel].append(callback)
+
+    def on_reconnect(self, callback: Callable[[], Any]) -> None:
+        """
+        Register a callback for when notifications may have been missed.
+        """
+        self._reconnect_callbacks.append(callback)
+
+    def _dispatch(self, connection, pid, channel, payload) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"NOTIFY handler for {channel} failed: {str(e)}")
+
+    async def _connect(self) -> None:
+        self._connection = await self._engine.raw_connection()
+        driver_connection = self._connection.driver_connection
+        for channel in self._callbacks:
+            await driver_connection.add_listener(channel, self._dispatch)
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(RECONNECT_INTERVAL)
+            if self._connection is not None and not self._connection.driver_connection.is_closed():
+                continue
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.warning(f"LISTEN connection unavailable: {str(e)}")
+                continue
+            for callback in self._reconnect_callbacks:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+
+    async def start(self, engine: AsyncEngine) -> None:
+        self._engine = engine
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.warning(f"LISTEN connection unavailable: {str(e)}")
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+            finally:
+                self._connection = None
+
+
+async def notify(db: AsyncSession, channel: str, payload: str) -> None:
+    """
+    Send a NOTIFY to all workers. Delivered when the caller commits the transaction.
+    """
+    await db.execute(select(func.pg_notify(channel, payload)))
+
+
+listener = PgListener()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import sys
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.db.session import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+# Arbitrary application-wide key for pg_advisory_lock, serializes migrations across workers
+MIGRATION_LOCK_KEY = 7_316_284_001
+
+# Databases created by the old create_all startup match this revision
+LEGACY_BASELINE = "0001"
+
+
+def get_alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return config
+
+
+def is_legacy_schema(sync_conn) -> bool:
+    """
+    Tables exist but Alembic has never run: a database from the create_all days.
+    """
+    tables = set(inspect(sync_conn).get_table_names())
+    return "users" in tables and "alembic_version" not in tables
+
+
+async def ensure_schema(engine: AsyncEngine, migrate: Optional[bool] = None) -> None:
+    """
+    Startup schema check, replaces create_all.
+    With `migrate` (default DB_AUTO_MIGRATE) the first worker to take the
+    advisory lock upgrades to head and the others find the schema current
+    once they get the lock. A legacy create_all database is stamped with
+    LEGACY_BASELINE first. Otherwise only compares the database revision with
+    the migration head.
+    """
+    if migrate is None:
+        migrate = settings.DB_AUTO_MIGRATE
+    config = get_alembic_config()
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+
+    async with engine.connect() as conn:
+        if migrate:
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            current = set(await conn.run_sync(
+                lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+            ))
+            if current == heads:
+                return
+            legacy = not current and await conn.run_sync(is_legacy_schema)
+            if not migrate:
+                hint = f"alembic stamp {LEGACY_BASELINE} && alembic upgrade head" if legacy else "alembic upgrade head"
+                logger.warning(
+                    f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(heads)}. "
+                    f"Run '{hint}'."
+                )
+                return
+
+            def upgrade(sync_conn):
+                config.attributes["connection"] = sync_conn
+                if legacy:
+                    command.stamp(config, LEGACY_BASELINE)
+                command.upgrade(config, "head")
+
+            if legacy:
+                logger.info(f"Tables exist without an Alembic revision, stamping {LEGACY_BASELINE}")
+            logger.info(f"Upgrading database schema from {sorted(current) or 'empty'} to {sorted(heads)}")
+            await conn.run_sync(upgrade)
+            await conn.commit()
+        finally:
+            if migrate:
+                # The lock is session-level, so it survives the rollback of a failed upgrade
+                await conn.rollback()
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                await conn.commit()
+
+
+async def main() -> None:
+    try:
+        await ensure_schema(engine, migrate=True)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # Container entry point: "python -m app.db.schema" upgrades (or stamps and
+    # upgrades a legacy database) before the workers start
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        logger.exception(f"Database migration failed: {str(e)}")
+        sys.exit(1)
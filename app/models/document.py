@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, func
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, Computed, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
-from app.db.base import Base
+from app.db.base_class import Base
+
+# Text search configuration used both for the stored tsvector and for queries
+SEARCH_CONFIG = "simple"
 
 
 class Document(Base):
@@ -14,16 +17,47 @@ class Document(Base):
     filename = Column(String, nullable=False)
     content_type = Column(String, nullable=False)
     current_version_id = Column(Integer, nullable=True)
+    # Highest version number handed out; bumped with UPDATE ... RETURNING.
+    # Versions are append-only, so this is also the current version's number.
+    last_version_number = Column(Integer, nullable=False, default=0, server_default="0")
+    # Copy of the current version, written in the same transaction as it,
+    # so listings, downloads and verify don't have to look it up
+    current_file_size = Column(Integer, nullable=True)
+    current_file_hash = Column(String, nullable=True)
+    current_storage_path = Column(String, nullable=True)
+    current_nonce = Column(String, nullable=True)
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     is_deleted = Column(Boolean, default=False)
 
+    # Full-text search: extracted file text and a generated, weighted tsvector
+    content_text = deferred(Column(Text, nullable=True))
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content_text, '')), 'C')",
+            persisted=True,
+        ),
+    ))
+
     # Relationships
     creator = relationship("User", back_populates="documents")
     versions = relationship("DocumentVersion", back_populates="document")
     access_list = relationship("DocumentAccess", back_populates="document")
 
+    __table_args__ = (
+        # Keyset pagination indexes, one per sortable column with id as tie-breaker
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_updated_at_id", "updated_at", "id"),
+        Index("ix_documents_title_id", "title", "id"),
+        Index("ix_documents_creator_id_created_at_id", "creator_id", "created_at", "id"),
+        Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_documents_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
+
 
 class DocumentVersion(Base):
     __tablename__ = "document_versions"
@@ -45,6 +79,11 @@ class DocumentVersion(Base):
     document = relationship("Document", back_populates="versions")
     user = relationship("User")
 
+    __table_args__ = (
+        # One row per version number; also serves lookups by document_id
+        UniqueConstraint("document_id", "version_number", name="uq_document_versions_document_id_version_number"),
+    )
+
 
 class DocumentAccess(Base):
     __tablename__ = "document_access"
@@ -57,3 +96,9 @@ class DocumentAccess(Base):
     document = relationship("Document", back_populates="access_list")
     user = relationship("User")
 
+    __table_args__ = (
+        # One grant per user and document; the ON CONFLICT target of grant upserts
+        UniqueConstraint("document_id", "user_id", name="uq_document_access_document_id_user_id"),
+        Index("ix_document_access_user_id_document_id", "user_id", "document_id"),
+    )
+
@@ -0,0 +1,115 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index, DDL, event, func, text
+
+from app.db.base_class import Base
+
+# Filled by triggers on documents, document_versions and document_access, so every
+# write path (ORM, bulk statements, manual SQL) lands in the log.
+# create_all installs these definitions; migrations 0009 and 0010 carry their own
+# copies. Keep them in step, and ship any change to a function as a new migration.
+RECORD_DOCUMENT_CHANGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_document_change() RETURNS trigger AS $$
+DECLARE
+    rec RECORD;
+    change_action TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+        change_action := 'deleted';
+    ELSE
+        rec := NEW;
+        change_action := CASE WHEN TG_OP = 'INSERT' THEN 'created' ELSE 'updated' END;
+    END IF;
+
+    IF TG_TABLE_NAME = 'documents' THEN
+        IF TG_OP = 'UPDATE' THEN
+            -- Background writes (content indexing) keep updated_at and are not changes
+            IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at
+               AND NEW.is_deleted IS NOT DISTINCT FROM OLD.is_deleted THEN
+                RETURN NULL;
+            END IF;
+            IF NEW.is_deleted AND NOT coalesce(OLD.is_deleted, false) THEN
+                change_action := 'deleted';
+            END IF;
+        END IF;
+        INSERT INTO document_changes (document_id, entity, entity_id, action)
+        VALUES (rec.id, 'document', rec.id, change_action);
+    ELSIF TG_TABLE_NAME = 'document_versions' THEN
+        INSERT INTO document_changes (document_id, entity, entity_id, action)
+        VALUES (rec.document_id, 'version', rec.id, change_action);
+    ELSE
+        INSERT INTO document_changes (document_id, entity, entity_id, action, user_id)
+        VALUES (rec.document_id, 'access', rec.id, change_action, rec.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+DOCUMENT_CHANGE_TABLES = ("documents", "document_versions", "document_access")
+
+# Every logged change is also announced to the workers (delivered on commit)
+DOCUMENT_EVENTS_CHANNEL = "document_events"
+
+NOTIFY_DOCUMENT_CHANGE_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_document_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{DOCUMENT_EVENTS_CHANNEL}', json_build_object(
+        'id', NEW.id,
+        'document_id', NEW.document_id,
+        'entity', NEW.entity,
+        'action', NEW.action,
+        'user_id', NEW.user_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+class DocumentChange(Base):
+    """
+    Append-only change log read by the delta sync endpoint.
+    `txid` is the writing transaction; clients page by (txid, id) and only up to
+    the oldest transaction still in flight, so a row committed late is never skipped.
+    """
+    __tablename__ = "document_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    txid = Column(BigInteger, nullable=False, server_default=text("txid_current()"))
+    document_id = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # document/version/access
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # created/updated/deleted
+    user_id = Column(Integer, nullable=True)  # grantee, for access entries
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_document_changes_txid_id", "txid", "id"),
+    )
+
+
+class DocumentChangeHorizon(Base):
+    """
+    Position (txid, change_id) of the newest change removed by retention; a
+    single row with id 1. A cursor before it may have missed changes.
+    """
+    __tablename__ = "document_change_horizon"
+
+    id = Column(Integer, primary_key=True)
+    txid = Column(BigInteger, nullable=False)
+    change_id = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+event.listen(Base.metadata, "after_create", DDL(RECORD_DOCUMENT_CHANGE_FUNCTION))
+for _table in DOCUMENT_CHANGE_TABLES:
+    event.listen(Base.metadata, "after_create", DDL(
+        f"CREATE TRIGGER {_table}_record_change "
+        f"AFTER INSERT OR UPDATE OR DELETE ON {_table} "
+        f"FOR EACH ROW EXECUTE FUNCTION record_document_change()"
+    ))
+event.listen(Base.metadata, "after_create", DDL(NOTIFY_DOCUMENT_CHANGE_FUNCTION))
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE TRIGGER document_changes_notify AFTER INSERT ON document_changes "
+    "FOR EACH ROW EXECUTE FUNCTION notify_document_change()"
+))
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime, Index
+
+from app.db.base_class import Base
+
+
+class TOTPSecret(Base):
+    """
+    Short-lived TOTP secrets shared by all workers.
+    UNLOGGED: losing pending codes on a crash is fine, WAL writes are not needed.
+    """
+    __tablename__ = "totp_secrets"
+
+    email = Column(String, primary_key=True)
+    secret = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_totp_secrets_expires_at", "expires_at"),
+        {"prefixes": ["UNLOGGED"]},
+    )
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index, func
 from sqlalchemy.orm import relationship
 
-from app.db.base import Base
+from app.db.base_class import Base
 
 
 class User(Base):
@@ -13,9 +13,29 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="user")  # user, manager, admin
     is_active = Column(Boolean, default=True)
+    # Bumped whenever role or is_active changes; access tokens carry it as "pv"
+    perm_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     documents = relationship("Document", back_populates="creator")
     refresh_tokens = relationship("RefreshToken", back_populates="user")
+
+    __table_args__ = (
+        # Substring search over email / full name (pg_trgm)
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+    )
+
+
+class RevokedUser(Base):
+    """
+    Deleted users whose access tokens may still be unexpired. Workers load
+    these at startup and after a LISTEN reconnect, so a deletion announced
+    while they were not listening is not missed.
+    """
+    __tablename__ = "revoked_users"
+
+    user_id = Column(Integer, primary_key=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
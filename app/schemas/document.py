@@ -29,7 +29,25 @@ class DocumentVersionInDB(DocumentVersionBase):
     nonce: str
     file_hash: str
     prev_hash: Optional[str] = None
-    metadata: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class DocumentVersionSummary(BaseModel):
+    """
+    Version metadata for listings; storage location and nonce stay internal.
+    """
+    id: int
+    document_id: int
+    version_number: int
+    user_id: int
+    filename: str
+    content_type: str
+    file_size: int
+    file_hash: str
+    prev_hash: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -60,6 +78,9 @@ class DocumentInDB(DocumentBase):
     id: int
     creator_id: int
     current_version_id: Optional[int] = None
+    last_version_number: int = 0
+    current_file_size: Optional[int] = None
+    current_file_hash: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     is_deleted: bool
@@ -74,6 +95,7 @@ class DocumentWithVersions(DocumentInDB):
 
 # Filter for document list
 class DocumentListFilter(BaseModel):
+    q: Optional[str] = None
     title: Optional[str] = None
     creator_id: Optional[int] = None
     sort_by: str = "created_at"
@@ -89,9 +111,59 @@ class DocumentAccessCreate(DocumentAccessBase):
     pass
 
 
+class DocumentAccessGrant(DocumentAccessBase):
+    document_id: int
+
+
+class DocumentAccessRevoke(BaseModel):
+    document_id: int
+    user_id: int
+
+
+# Bulk sharing: many users on one document, one user on many documents, or any mix
+class DocumentShareRequest(BaseModel):
+    grants: List[DocumentAccessGrant]
+
+
+class DocumentUnshareRequest(BaseModel):
+    grants: List[DocumentAccessRevoke]
+
+
 class DocumentAccessInDB(DocumentAccessBase):
     id: int
     document_id: int
 
     class Config:
         orm_mode = True
+
+
+class DocumentBatchRequest(BaseModel):
+    ids: List[int]
+
+
+class DocumentBatchError(BaseModel):
+    id: int
+    status: int
+    detail: str
+
+
+class DocumentBatch(BaseModel):
+    """
+    Documents that could be read, in request order, and an error for every other id.
+    """
+    documents: List[DocumentInDB] = []
+    errors: List[DocumentBatchError] = []
+
+
+class DocumentChanges(BaseModel):
+    """
+    One page of the change log, or of a full sync when started without
+    `since`. Pass `cursor` back as `since`; keep paging while `has_more` is true.
+    """
+    cursor: str
+    has_more: bool
+    documents: List[DocumentInDB] = []
+    versions: List[DocumentVersionInDB] = []
+    access: List[DocumentAccessInDB] = []
+    deleted_documents: List[int] = []
+    deleted_access: List[int] = []
@@ -18,6 +18,10 @@ class TokenPayload(BaseModel):
     sub: Optional[str] = None
     exp: Optional[datetime] = None
     type: Optional[str] = None
+    # Authorization claims, absent in tokens issued before they were introduced
+    role: Optional[str] = None
+    active: Optional[bool] = None
+    pv: Optional[int] = None
 
 
 class TokenInDB(BaseModel):
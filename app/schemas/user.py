@@ -42,3 +42,10 @@ class UserInDB(UserInDBBase):
 # Properties to return via API
 class User(UserInDBBase):
     pass
+
+
+# Authenticated caller as resolved from the access token
+class UserPrincipal(BaseModel):
+    id: int
+    role: str
+    is_active: bool = True
@@ -1,18 +1,23 @@
+import asyncio
+import logging
 import pyotp
-from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
 
+from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.security import ALGORITHM
 from app.crud.crud_user import user_crud
 from app.crud.crud_token import token_crud
+from app.db.session import SessionLocal
 from app.models.user import User
 from app.services.email import send_email
+from app.services.totp_store import totp_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-# In-memory storage for TOTP secrets (in production, this should be stored in Redis or similar)
-# This is a simple implementation for demonstration purposes
-totp_secrets = {}
 
 async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """
@@ -20,40 +25,54 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> Opti
     """
     return await user_crud.authenticate(db, email=email, password=password)
 
-async def verify_refresh_token(db: AsyncSession, token: str) -> Optional[int]:
+def verify_refresh_token(token: str) -> Optional[int]:
     """
-    Verify if refresh token is valid and return user_id if it is.
+    Check the refresh token signature and type and return its user_id.
+    Whether it is still valid in the database is checked when it is rotated.
     """
-    db_token = await token_crud.get_by_token(db, token=token)
-    if not db_token or not db_token.is_valid or db_token.expires_at < datetime.now(timezone.utc):
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("type") != "refresh":
+            return None
+        return int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
         return None
-    return db_token.user_id
+
+async def cleanup_refresh_tokens() -> None:
+    """
+    Periodically delete expired and invalidated refresh tokens in batches.
+    Runs for the lifetime of the worker.
+    """
+    while True:
+        await asyncio.sleep(settings.REFRESH_TOKEN_CLEANUP_INTERVAL)
+        removed = 0
+        try:
+            async with SessionLocal() as db:
+                while True:
+                    deleted = await token_crud.delete_stale(
+                        db, batch_size=settings.REFRESH_TOKEN_CLEANUP_BATCH_SIZE
+                    )
+                    removed += deleted
+                    if deleted < settings.REFRESH_TOKEN_CLEANUP_BATCH_SIZE:
+                        break
+            if removed:
+                logger.info(f"Removed {removed} stale refresh tokens")
+        except Exception as e:
+            logger.warning(f"Refresh token cleanup failed: {str(e)}")
 
 async def generate_totp_secret(email: str) -> str:
     """
     Generate a TOTP secret for a user.
     """
     secret = pyotp.random_base32()
-    totp_secrets[email] = {
-        "secret": secret,
-        "created_at": datetime.utcnow()
-    }
+    await totp_store.set(email, secret, ttl=settings.TOTP_INTERVAL)
     return secret
 
 async def get_totp_secret(email: str) -> Optional[str]:
     """
-    Get the TOTP secret for a user.
+    Get the TOTP secret for a user, None if missing or expired.
     """
-    if email not in totp_secrets:
-        return None
-    
-    # Check if TOTP secret is expired (5 minutes)
-    created_at = totp_secrets[email]["created_at"]
-    if datetime.utcnow() - created_at > timedelta(minutes=5):
-        del totp_secrets[email]
-        return None
-        
-    return totp_secrets[email]["secret"]
+    return await totp_store.get(email)
 
 async def generate_totp_code(email: str) -> Tuple[str, str]:
     """
@@ -67,8 +86,10 @@ async def generate_totp_code(email: str) -> Tuple[str, str]:
 async def verify_totp(email: str, code: str) -> bool:
     """
     Verify a TOTP code for a user.
+    The secret is consumed atomically before the check, so each code gets one
+    attempt and concurrent logins with the same code cannot both succeed.
     """
-    secret = await get_totp_secret(email)
+    secret = await totp_store.consume(email)
     if not secret:
         return False
     
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_document import document_crud
+from app.models.document import Document
+from app.schemas.user import UserPrincipal
+
+PRIVILEGED_ROLES = ("manager", "admin")
+
+
+class DocumentAction(str, Enum):
+    READ = "read"
+    WRITE = "write"
+    DELETE = "delete"
+    SHARE = "share"
+
+
+@dataclass(frozen=True)
+class DocumentPermission:
+    """
+    Result of an authorization check: the document (None if it does not exist)
+    and what the caller may do with it.
+    """
+    document: Optional[Document]
+    is_owner: bool = False
+    access_level: Optional[str] = None
+    role: str = "user"
+
+    @property
+    def exists(self) -> bool:
+        return self.document is not None
+
+    @property
+    def is_privileged(self) -> bool:
+        return self.role in PRIVILEGED_ROLES
+
+    @property
+    def can_read(self) -> bool:
+        return self.exists and (self.is_owner or self.is_privileged or self.access_level is not None)
+
+    @property
+    def can_write(self) -> bool:
+        return self.exists and (self.is_owner or self.is_privileged or self.access_level == "write")
+
+    @property
+    def can_delete(self) -> bool:
+        return self.exists and (self.is_owner or self.is_privileged)
+
+    @property
+    def can_share(self) -> bool:
+        return self.exists and self.is_owner
+
+    def allows(self, action: DocumentAction) -> bool:
+        return {
+            DocumentAction.READ: self.can_read,
+            DocumentAction.WRITE: self.can_write,
+            DocumentAction.DELETE: self.can_delete,
+            DocumentAction.SHARE: self.can_share,
+        }[action]
+
+
+async def get_document_permission(
+    db: AsyncSession,
+    document_id: int,
+    user: UserPrincipal
+) -> DocumentPermission:
+    """
+    Load a document and the user's access to it with a single query.
+    """
+    row = await document_crud.get_with_access(db, document_id=document_id, user_id=user.id)
+    return _permission(row, user)
+
+
+async def get_document_permissions(
+    db: AsyncSession,
+    document_ids: Sequence[int],
+    user: UserPrincipal
+) -> Dict[int, DocumentPermission]:
+    """
+    Permissions for several documents with a single query, keyed by requested id.
+    """
+    rows = await document_crud.get_many_with_access(db, document_ids=document_ids, user_id=user.id)
+    return {document_id: _permission(rows.get(document_id), user) for document_id in document_ids}
+
+
+def _permission(row: Optional[tuple], user: UserPrincipal) -> DocumentPermission:
+    if row is None:
+        return DocumentPermission(document=None, role=user.role)
+    document, access_level = row
+    return DocumentPermission(
+        document=document,
+        is_owner=document.creator_id == user.id,
+        access_level=access_level,
+        role=user.role
+    )
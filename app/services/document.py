@@ -1,20 +1,31 @@
+import asyncio
 import hashlib
+import logging
 import uuid
-from typing import Optional, List, Tuple, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple, Any, Dict, Sequence
 
-from fastapi import UploadFile
+from fastapi import BackgroundTasks, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.crud_document import document_crud
+from app.crud.crud_document_change import document_change_crud
 from app.models.document import Document
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentVersionCreate, DocumentListFilter
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.services.minio import upload_file
+from app.services.text_extraction import index_document_content
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 async def create_document(
     db: AsyncSession,
     obj_in: DocumentCreate,
     file: UploadFile,
-    creator_id: int
+    creator_id: int,
+    background_tasks: Optional[BackgroundTasks] = None
 ) -> Document:
     """
     Create a new document with the first version.
@@ -42,12 +53,33 @@ async def create_document(
     )
     
     # Create document with version
-    return await document_crud.create_with_version(
+    document = await document_crud.create_with_version(
         db=db,
         obj_in=obj_in,
         version_in=version_in,
         creator_id=creator_id
     )
+    schedule_content_indexing(background_tasks, document, file_content)
+    return document
+
+def schedule_content_indexing(
+    background_tasks: Optional[BackgroundTasks],
+    document: Optional[Document],
+    file_content: bytes
+) -> None:
+    """
+    Queue text extraction of the current version for full-text search, if enabled.
+    """
+    if background_tasks is None or document is None or not settings.SEARCH_EXTRACT_CONTENT:
+        return
+    background_tasks.add_task(
+        index_document_content,
+        document.id,
+        document.current_version_id,
+        file_content,
+        document.filename,
+        document.content_type
+    )
 
 async def get_document_by_id(
     db: AsyncSession,
@@ -63,23 +95,16 @@ async def update_document(
     document_id: int,
     obj_in: DocumentUpdate,
     user_id: int,
-    file: Optional[UploadFile] = None
+    file: Optional[UploadFile] = None,
+    background_tasks: Optional[BackgroundTasks] = None
 ) -> Optional[Document]:
     """
     Update a document. If file is provided, create a new version.
     """
-    # Get document
-    document = await document_crud.get(db, id=document_id)
-    if not document:
-        return None
+    document = None
     
     # If file is provided, create a new version
     if file:
-        # Get current version for prev_hash
-        current_version = await document_crud.get_version(db, version_id=document.current_version_id)
-        if not current_version:
-            return None
-        
         # Read file content
         file_content = await file.read()
         file_size = len(file_content)
@@ -90,7 +115,7 @@ async def update_document(
         # Upload file to MinIO
         object_path, nonce, file_hash = await upload_file(file_content, storage_path)
         
-        # Create version
+        # Create version; add_version links prev_hash to the previous version
         version_in = DocumentVersionCreate(
             filename=file.filename,
             content_type=file.content_type,
@@ -98,7 +123,6 @@ async def update_document(
             storage_path=object_path,
             nonce=nonce,
             file_hash=file_hash,
-            prev_hash=current_version.file_hash,  # Link to previous version
             metadata={"original_name": file.filename}
         )
         
@@ -109,10 +133,17 @@ async def update_document(
             version_in=version_in,
             user_id=user_id
         )
+        if not document:
+            return None
+        schedule_content_indexing(background_tasks, document, file_content)
     
     # Update document metadata
     if obj_in.title is not None or obj_in.description is not None or obj_in.is_deleted is not None:
-        document = await document_crud.update(db, db_obj=document, obj_in=obj_in)
+        document = await document_crud.update_fields(
+            db, document_id=document_id, values=obj_in.dict(exclude_unset=True)
+        )
+    elif document is None:
+        document = await document_crud.get(db, id=document_id)
     
     return document
 
@@ -130,10 +161,13 @@ async def search_documents(
     filters: DocumentListFilter,
     user_id: int,
     skip: int = 0,
-    limit: int = 100
-) -> List[Document]:
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns: Optional[Sequence[Any]] = None
+) -> Dict[str, Any]:
     """
     Search for documents based on filters.
+    Returns a page with "items", "next_cursor" and "prev_cursor".
     """
     return await document_crud.search_documents(
         db=db,
@@ -141,28 +175,56 @@ async def search_documents(
         user_id=user_id,
         skip=skip,
         limit=limit,
-
+        cursor=cursor,
+        columns=columns
     )
 
+async def get_document_changes(
+    db: AsyncSession,
+    user_id: int,
+    since: Optional[str] = None,
+    limit: int = 500
+) -> Dict[str, Any]:
+    """
+    Documents, versions and ACL entries changed since the cursor, for delta sync.
+    """
+    return await document_change_crud.get_changes(db, user_id=user_id, since=since, limit=limit)
+
+async def cleanup_document_changes() -> None:
+    """
+    Periodically delete change log entries older than DOCUMENT_CHANGES_RETENTION_DAYS
+    in batches. Runs for the lifetime of the worker.
+    """
+    while True:
+        await asyncio.sleep(settings.DOCUMENT_CHANGES_CLEANUP_INTERVAL)
+        before = datetime.now(timezone.utc) - timedelta(days=settings.DOCUMENT_CHANGES_RETENTION_DAYS)
+        removed = 0
+        try:
+            async with SessionLocal() as db:
+                while True:
+                    deleted = await document_change_crud.delete_expired(
+                        db, before=before, batch_size=settings.DOCUMENT_CHANGES_CLEANUP_BATCH_SIZE
+                    )
+                    removed += deleted
+                    if deleted < settings.DOCUMENT_CHANGES_CLEANUP_BATCH_SIZE:
+                        break
+            if removed:
+                logger.info(f"Removed {removed} document change log entries")
+        except Exception as e:
+            logger.warning(f"Document change log cleanup failed: {str(e)}")
+
 async def verify_document_integrity(
     db: AsyncSession,
-    document_id: int
+    document: Document
 ) -> Tuple[bool, str]:
     """
-    Verify the integrity of a document by checking the hash chain.
+    Verify the integrity of a document by checking the hash chain,
+    and that the document's current version summary matches its head.
     """
-    # Get document with all versions
-    doc_with_versions = await document_crud.get_with_versions(db, document_id=document_id)
-    if not doc_with_versions:
-        return False, "Document not found"
-    
-    versions = doc_with_versions["versions"]
+    versions = await document_crud.get_hash_chain(db, document_id=document.id)
     if not versions:
         return False, "Document has no versions"
     
-    # Verify the hash chain - versions are ordered by version_number desc
-    versions.reverse()  # Reverse to get chronological order
-    
     # Check first version has no prev_hash
     if versions[0].prev_hash is not None:
         return False, "First version has a previous hash set, which is invalid"
@@ -172,4 +234,8 @@ async def verify_document_integrity(
         if versions[i].prev_hash != versions[i-1].file_hash:
             return False, f"Hash chain broken at version {versions[i].version_number}"
     
+    head = versions[-1]
+    if head.version_number != document.last_version_number or head.file_hash != document.current_file_hash:
+        return False, f"Current version does not match version {head.version_number}"
+    
     return True, "Document integrity verified"
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select, union
+
+from app.core.config import settings
+from app.db.notifications import listener
+from app.db.session import SessionLocal
+from app.models.document import Document, DocumentAccess
+from app.models.document_change import DOCUMENT_EVENTS_CHANNEL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def event_type(entity: str, action: str) -> str:
+    """
+    Map a change log entry to the event pushed to clients.
+    """
+    if entity == "access":
+        return "document.unshared" if action == "deleted" else "document.shared"
+    if entity == "version":
+        return "document.updated"
+    return f"document.{action}"
+
+
+class DocumentEventHub:
+    """
+    Pushes document change events to the users connected to this worker.
+    Changes arrive from Postgres NOTIFY (any worker may have made them); each
+    event goes only to connected users who own or were granted the document.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._pending: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._pending = asyncio.Queue(maxsize=settings.DOCUMENT_EVENTS_BACKLOG)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.DOCUMENT_EVENTS_CLIENT_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def on_notify(self, payload: str) -> None:
+        if not self._subscribers or self._pending is None:
+            return
+        try:
+            self._pending.put_nowait(json.loads(payload))
+        except asyncio.QueueFull:
+            logger.warning("Document event backlog is full, asking clients to resync")
+            self.broadcast_resync()
+
+    def broadcast_resync(self) -> None:
+        """
+        Events may have been lost: tell every client to catch up via /documents/changes.
+        """
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._deliver(queue, {"type": "resync"})
+
+    def _deliver(self, queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has not read and let it resync
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    async def _recipients(self, change: Dict[str, Any]) -> Set[int]:
+        connected = list(self._subscribers)
+        document_id = change["document_id"]
+        query = union(
+            select(Document.creator_id).where(Document.id == document_id),
+            select(DocumentAccess.user_id).where(
+                DocumentAccess.document_id == document_id,
+                DocumentAccess.user_id.in_(connected)
+            )
+        )
+        async with SessionLocal() as db:
+            result = await db.execute(query)
+            recipients = set(result.scalars().all())
+        # A revoked grantee has no access row any more but still needs the event
+        if change["entity"] == "access" and change.get("user_id") is not None:
+            recipients.add(change["user_id"])
+        return recipients & set(connected)
+
+    async def _run(self) -> None:
+        while True:
+            change = await self._pending.get()
+            if not self._subscribers:
+                continue
+            try:
+                recipients = await self._recipients(change)
+            except Exception as e:
+                logger.error(f"Failed to resolve document event recipients: {str(e)}")
+                continue
+            event = {
+                "type": event_type(change["entity"], change["action"]),
+                "document_id": change["document_id"],
+                "change_id": change["id"],
+            }
+            for user_id in recipients:
+                for queue in self._subscribers.get(user_id, ()):
+                    self._deliver(queue, event)
+
+
+document_events = DocumentEventHub()
+
+listener.subscribe(DOCUMENT_EVENTS_CHANNEL, document_events.on_notify)
+listener.on_reconnect(document_events.broadcast_resync)
@@ -1,14 +1,191 @@
+import asyncio
 import logging
-import smtplib
+import time
+from collections import deque
+from dataclasses import dataclass
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+import aiosmtplib
 
 from app.core.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class EmailJob:
+    message: MIMEMultipart
+    email_to: str
+    attempts: int = 0
+    last_error: Optional[str] = None
+
+
+class EmailQueue:
+    """
+    Background delivery over one persistent SMTP connection per worker.
+    Jobs are sent in batches; failures are retried with exponential backoff
+    and end up in the dead-letter list after EMAIL_MAX_RETRIES attempts.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retries: set = set()
+        self._last_used = 0.0
+        self.dead_letters: deque = deque(maxlen=settings.EMAIL_DEAD_LETTER_SIZE)
+        self.sent = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=settings.EMAIL_QUEUE_MAX_SIZE)
+        self._start_task()
+
+    def _start_task(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        # The loop only ends by cancellation; anything else would stop delivery for good
+        if task.cancelled() or task is not self._task:
+            return
+        logger.error("Email delivery task died, restarting", exc_info=task.exception())
+        self._start_task()
+
+    async def stop(self) -> None:
+        """
+        Give queued mail a chance to go out, then close the connection.
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=settings.EMAIL_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} emails still queued at shutdown")
+        task, self._task = self._task, None
+        task.cancel()
+        for retry in self._retries:
+            retry.cancel()
+        await self._disconnect()
+
+    def enqueue(self, job: EmailJob) -> bool:
+        if self._queue is None:
+            logger.error(f"Email queue is not running, email to {job.email_to} dropped")
+            return False
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.error(f"Email queue is full, email to {job.email_to} dropped")
+            self._dead_letter(job, "queue full")
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retrying": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead_letters": len(self.dead_letters),
+        }
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        # Drop connections the server has probably closed on its side
+        idle = time.monotonic() - self._last_used
+        if self._smtp is not None and (not self._smtp.is_connected or idle > settings.SMTP_IDLE_TIMEOUT):
+            await self._disconnect()
+        if self._smtp is None:
+            smtp = aiosmtplib.SMTP(
+                hostname=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                start_tls=settings.SMTP_TLS,
+                timeout=settings.SMTP_TIMEOUT,
+            )
+            await smtp.connect()
+            if settings.SMTP_USER and settings.SMTP_PASSWORD:
+                await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+            self._smtp = smtp
+        self._last_used = time.monotonic()
+        return self._smtp
+
+    async def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            if self._smtp.is_connected:
+                await self._smtp.quit()
+        except Exception as e:
+            # The connection is being dropped anyway
+            logger.debug(f"SMTP quit failed: {str(e)}")
+        finally:
+            self._smtp = None
+
+    async def _next_batch(self) -> List[EmailJob]:
+        batch = [await self._queue.get()]
+        while len(batch) < settings.EMAIL_BATCH_SIZE and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            for job in batch:
+                try:
+                    await self._send(job)
+                finally:
+                    self._queue.task_done()
+
+    async def _send(self, job: EmailJob) -> None:
+        job.attempts += 1
+        try:
+            smtp = await self._connection()
+            await smtp.send_message(job.message)
+            self.sent += 1
+            logger.info(f"Email sent to {job.email_to}")
+        except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+            self.failed += 1
+            job.last_error = str(e)
+            await self._disconnect()
+            if job.attempts >= settings.EMAIL_MAX_RETRIES:
+                self._dead_letter(job, job.last_error)
+            else:
+                self._schedule_retry(job)
+        except Exception as e:
+            # Not a delivery problem (e.g. a malformed message), retrying will not help
+            logger.exception(f"Unexpected error sending email to {job.email_to}")
+            self.failed += 1
+            job.last_error = f"{type(e).__name__}: {str(e)}"
+            await self._disconnect()
+            self._dead_letter(job, job.last_error)
+
+    def _schedule_retry(self, job: EmailJob) -> None:
+        delay = settings.EMAIL_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        logger.warning(f"Email to {job.email_to} failed ({job.last_error}), retrying in {delay}s")
+
+        async def retry():
+            await asyncio.sleep(delay)
+            self.enqueue(job)
+
+        task = asyncio.create_task(retry())
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    def _dead_letter(self, job: EmailJob, error: str) -> None:
+        logger.error(f"Email to {job.email_to} moved to dead letters after {job.attempts} attempts: {error}")
+        self.dead_letters.append({
+            "email_to": job.email_to,
+            "subject": job.message["Subject"],
+            "attempts": job.attempts,
+            "error": error,
+        })
+
+
+email_queue = EmailQueue()
+
+
 async def send_email(
     email_to: str,
     subject_template: str,
@@ -16,37 +193,21 @@ async def send_email(
     environment: Optional[Dict[str, Any]] = None,
 ) -> bool:
     """
-    Send an email to a recipient.
+    Queue an email for delivery. Returns once it is queued, not when it is sent.
     """
     # Check if SMTP settings are configured
-    if not settings.SMTP_HOST or not settings.SMTP_PORT or not settings.EMAILS_FROM_EMAIL:
+    if not settings.EMAILS_ENABLED or not settings.SMTP_HOST or not settings.SMTP_PORT or not settings.EMAILS_FROM_EMAIL:
         logger.warning("SMTP settings not configured, email not sent")
         # For development, just log the email
         logger.info(f"Would send email to {email_to}: {subject_template}")
         logger.info(f"Content: {html_template}")
         return True
-    
+
     message = MIMEMultipart()
     message["From"] = f"{settings.EMAILS_FROM_NAME} <{settings.EMAILS_FROM_EMAIL}>"
     message["To"] = email_to
     message["Subject"] = subject_template
-    
+
     message.attach(MIMEText(html_template, "html"))
-    
-    try:
-        print(html_template)
-        # with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-        #     if settings.SMTP_TLS:
-        #         server.starttls()
-        #     if settings.SMTP_USER and settings.SMTP_PASSWORD:
-        #         server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        #     server.sendmail(
-        #         settings.EMAILS_FROM_EMAIL,
-        #         email_to,
-        #         message.as_string()
-        #     )
-        logger.info(f"Email sent to {email_to}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email to {email_to}: {str(e)}")
-        return False
+
+    return email_queue.enqueue(EmailJob(message=message, email_to=email_to))
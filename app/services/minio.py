@@ -92,24 +92,16 @@ async def get_file(file_path: str, nonce_hex: str) -> Optional[bytes]:
         logger.error(f"Failed to get file from MinIO: {str(e)}")
         return None
 
-async def get_document_file(document_id: int, version_id: int) -> io.BytesIO:
+async def get_document_file(storage_path: str, nonce: str) -> io.BytesIO:
     """
-    Get a document file by document_id and version_id.
+    Get a document file by its storage path and nonce.
     Returns a file-like object for streaming.
     """
-    from app.db.session import SessionLocal
-    from app.crud.crud_document import document_crud
+    file_content = await get_file(storage_path, nonce)
+    if not file_content:
+        raise ValueError(f"Failed to retrieve file content from {storage_path}")
     
-    async with SessionLocal() as db:
-        version = await document_crud.get_version(db, version_id=version_id)
-        if not version:
-            raise ValueError(f"Document version {version_id} not found")
-        
-        file_content = await get_file(version.storage_path, version.nonce)
-        if not file_content:
-            raise ValueError(f"Failed to retrieve file content for document {document_id}")
-        
-        return io.BytesIO(file_content)
+    return io.BytesIO(file_content)
 
 async def delete_file(file_path: str) -> bool:
     """
@@ -0,0 +1,91 @@
+import asyncio
+import io
+import logging
+import zipfile
+from typing import Optional
+from xml.etree import ElementTree
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.document import Document
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Upper bound for the unpacked word/document.xml, guards against zip bombs
+DOCX_MAX_XML_SIZE = 50 * 1024 * 1024
+
+
+def _extract_txt(content: bytes) -> str:
+    return content.decode("utf-8", errors="replace")
+
+
+def _extract_xml(content: bytes) -> str:
+    root = ElementTree.fromstring(content)
+    return " ".join(text.strip() for text in root.itertext() if text.strip())
+
+
+def _extract_docx(content: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        if archive.getinfo("word/document.xml").file_size > DOCX_MAX_XML_SIZE:
+            raise ValueError("word/document.xml is too large")
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{DOCX_NS}p"):
+        text = "".join(node.text or "" for node in paragraph.iter(f"{DOCX_NS}t"))
+        if text:
+            paragraphs.append(text)
+    return "\n".join(paragraphs)
+
+
+def extract_text(content: bytes, filename: str, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Extract plain text from txt, xml and docx files.
+    Returns None for unsupported formats or unreadable files.
+    """
+    name = (filename or "").lower()
+    content_type = content_type or ""
+    try:
+        if name.endswith(".docx") or content_type.endswith("wordprocessingml.document"):
+            text = _extract_docx(content)
+        elif name.endswith(".xml") or content_type in ("application/xml", "text/xml"):
+            text = _extract_xml(content)
+        elif name.endswith(".txt") or content_type.startswith("text/plain"):
+            text = _extract_txt(content)
+        else:
+            return None
+    except (zipfile.BadZipFile, KeyError, ValueError, ElementTree.ParseError) as e:
+        logger.warning(f"Failed to extract text from {filename}: {str(e)}")
+        return None
+    return text[:settings.SEARCH_MAX_CONTENT_CHARS]
+
+
+async def index_document_content(
+    document_id: int,
+    version_id: int,
+    content: bytes,
+    filename: str,
+    content_type: Optional[str] = None
+) -> None:
+    """
+    Background task: store the extracted text of a version on its document.
+    Skipped if a newer version has become current in the meantime.
+    Parsing runs in the default thread pool so large uploads do not block the event loop.
+    """
+    text = await asyncio.get_running_loop().run_in_executor(
+        None, extract_text, content, filename, content_type
+    )
+    if text is None:
+        return
+
+    async with SessionLocal() as db:
+        await db.execute(
+            update(Document)
+            .where(Document.id == document_id, Document.current_version_id == version_id)
+            # Keep updated_at: indexing is not a change of the document itself
+            .values(content_text=text, updated_at=Document.updated_at)
+        )
+        await db.commit()
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.crud_user import user_crud
+from app.db.notifications import listener, notify
+from app.db.session import SessionLocal
+from app.models.user import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PERM_VERSION_CHANNEL = "user_perm_version"
+
+# Minimum permission version for a deleted user, rejects every token
+REVOKED_ALL = 2 ** 31 - 1
+
+# user_id -> lowest "pv" claim still accepted; users at version 0 are not stored
+_min_versions: Dict[int, int] = {}
+
+
+def is_token_current(user_id: int, perm_version: int) -> bool:
+    """
+    Check an access token's permission version without touching the database.
+    """
+    return perm_version >= _min_versions.get(user_id, 0)
+
+
+def _set_version(user_id: int, perm_version: int) -> None:
+    if perm_version > _min_versions.get(user_id, 0):
+        _min_versions[user_id] = perm_version
+
+
+async def publish_permission_version(db: AsyncSession, user_id: int, perm_version: int) -> None:
+    """
+    Record a new permission version here and in all other workers.
+    Other workers hear about it when the caller commits.
+    """
+    _set_version(user_id, perm_version)
+    await notify(db, PERM_VERSION_CHANNEL, f"{user_id}:{perm_version}")
+
+
+async def load_permission_versions() -> None:
+    """
+    Load all non-zero permission versions, and the users deleted within an
+    access token lifetime, at startup and after a LISTEN reconnect when
+    notifications may have been missed.
+    """
+    token_lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    try:
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(User.id, User.perm_version).filter(User.perm_version > 0)
+            )
+            for user_id, perm_version in result.all():
+                _set_version(user_id, perm_version)
+            # Deleted users have no row left to carry a permission version
+            revoked = await user_crud.get_revoked_ids(db, since=datetime.now(timezone.utc) - token_lifetime)
+            for user_id in revoked:
+                _set_version(user_id, REVOKED_ALL)
+    except Exception as e:
+        logger.error(f"Failed to load permission versions: {str(e)}")
+
+
+def _on_version(payload: str) -> None:
+    user_id, perm_version = payload.split(":")
+    _set_version(int(user_id), int(perm_version))
+
+
+listener.subscribe(PERM_VERSION_CHANNEL, _on_version)
+listener.on_reconnect(load_permission_versions)
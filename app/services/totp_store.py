@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.totp import TOTPSecret
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TOTPSecretStore(ABC):
+    """
+    Keyed by email, entries expire after `ttl` seconds.
+    """
+
+    @abstractmethod
+    async def set(self, email: str, secret: str, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, email: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def consume(self, email: str) -> Optional[str]:
+        """
+        Atomically remove the entry and return its secret, None if missing or
+        expired. Of several concurrent callers at most one gets the secret.
+        """
+
+    @abstractmethod
+    async def delete(self, email: str) -> None:
+        ...
+
+    async def sweep(self) -> int:
+        """
+        Remove expired entries, returns how many were removed.
+        """
+        return 0
+
+
+class MemoryTOTPSecretStore(TOTPSecretStore):
+    """
+    Process-local store. Only correct with a single worker; used for development and tests.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+
+    async def set(self, email: str, secret: str, ttl: int) -> None:
+        self._data[email] = (secret, time.monotonic() + ttl)
+
+    async def get(self, email: str) -> Optional[str]:
+        item = self._data.get(email)
+        if item is None or item[1] < time.monotonic():
+            return None
+        return item[0]
+
+    async def consume(self, email: str) -> Optional[str]:
+        # No await between lookup and removal, so this is atomic within the event loop
+        item = self._data.pop(email, None)
+        if item is None or item[1] < time.monotonic():
+            return None
+        return item[0]
+
+    async def delete(self, email: str) -> None:
+        self._data.pop(email, None)
+
+    async def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [email for email, (_, expires_at) in self._data.items() if expires_at < now]
+        for email in expired:
+            del self._data[email]
+        return len(expired)
+
+
+class PostgresTOTPSecretStore(TOTPSecretStore):
+    """
+    UNLOGGED totp_secrets table, primary-key lookups; expired rows are swept periodically.
+    """
+
+    async def set(self, email: str, secret: str, ttl: int) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        stmt = insert(TOTPSecret).values(email=email, secret=secret, expires_at=expires_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TOTPSecret.email],
+            set_={"secret": stmt.excluded.secret, "expires_at": stmt.excluded.expires_at},
+        )
+        async with SessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+    async def get(self, email: str) -> Optional[str]:
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(TOTPSecret.secret).where(
+                    TOTPSecret.email == email, TOTPSecret.expires_at > func.now()
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def consume(self, email: str) -> Optional[str]:
+        # The row lock makes concurrent deletes of the same row return it only once
+        async with SessionLocal() as db:
+            result = await db.execute(
+                delete(TOTPSecret)
+                .where(TOTPSecret.email == email)
+                .returning(TOTPSecret.secret, TOTPSecret.expires_at > func.now())
+            )
+            row = result.first()
+            await db.commit()
+        if row is None or not row[1]:
+            return None
+        return row[0]
+
+    async def delete(self, email: str) -> None:
+        async with SessionLocal() as db:
+            await db.execute(delete(TOTPSecret).where(TOTPSecret.email == email))
+            await db.commit()
+
+    async def sweep(self) -> int:
+        async with SessionLocal() as db:
+            result = await db.execute(delete(TOTPSecret).where(TOTPSecret.expires_at <= func.now()))
+            await db.commit()
+            return result.rowcount
+
+
+class RedisTOTPSecretStore(TOTPSecretStore):
+    """
+    Any Redis-compatible server; expiry is native (SET ... EX), nothing to sweep.
+    `client` is a redis.asyncio client or a compatible stand-in.
+    """
+
+    KEY_PREFIX = "totp:"
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    async def set(self, email: str, secret: str, ttl: int) -> None:
+        await self._client.set(self.KEY_PREFIX + email, secret, ex=ttl)
+
+    async def get(self, email: str) -> Optional[str]:
+        return self._decode(await self._client.get(self.KEY_PREFIX + email))
+
+    async def consume(self, email: str) -> Optional[str]:
+        # GETDEL (Redis 6.2+) is a single atomic command
+        return self._decode(await self._client.getdel(self.KEY_PREFIX + email))
+
+    @staticmethod
+    def _decode(value: Any) -> Optional[str]:
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    async def delete(self, email: str) -> None:
+        await self._client.delete(self.KEY_PREFIX + email)
+
+
+def create_totp_store() -> TOTPSecretStore:
+    if settings.TOTP_STORE == "memory":
+        return MemoryTOTPSecretStore()
+    if settings.TOTP_STORE == "redis":
+        # Optional dependency, only needed for this backend
+        from redis import asyncio as redis_asyncio
+        return RedisTOTPSecretStore(redis_asyncio.from_url(settings.REDIS_URL))
+    if settings.TOTP_STORE == "postgres":
+        return PostgresTOTPSecretStore()
+    raise ValueError(f"Unknown TOTP_STORE: {settings.TOTP_STORE}")
+
+
+totp_store = create_totp_store()
+
+
+async def sweep_totp_secrets() -> None:
+    """
+    Periodically remove expired secrets. Runs for the lifetime of the worker.
+    """
+    while True:
+        await asyncio.sleep(settings.TOTP_SWEEP_INTERVAL)
+        try:
+            removed = await totp_store.sweep()
+            if removed:
+                logger.info(f"Removed {removed} expired TOTP secrets")
+        except Exception as e:
+            logger.warning(f"TOTP sweep failed: {str(e)}")
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.crud_user import user_crud
+from app.db.notifications import listener, notify
+from app.models.user import User
+
+USER_CACHE_CHANNEL = "user_cache_invalidate"
+
+# user_id -> column values of the users row
+_cache = TTLCache(ttl=settings.USER_CACHE_TTL_SECONDS, maxsize=settings.USER_CACHE_MAX_SIZE)
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+
+async def get_cached_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    Get a user by id, served from the short-TTL cache when possible.
+    The returned User is a detached snapshot: read it, but load the row
+    with user_crud.get before modifying it.
+    """
+    values = _cache.get(user_id)
+    if values is None:
+        user = await user_crud.get(db, id=user_id)
+        if not user:
+            return None
+        values = _snapshot(user)
+        _cache.set(user_id, values)
+    return User(**values)
+
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> None:
+    """
+    Drop a user from the cache in this worker and, via NOTIFY, in all others.
+    Other workers hear about it when the caller commits.
+    """
+    _cache.pop(user_id)
+    await notify(db, USER_CACHE_CHANNEL, str(user_id))
+
+
+def _on_invalidate(payload: str) -> None:
+    _cache.pop(int(payload))
+
+
+listener.subscribe(USER_CACHE_CHANNEL, _on_invalidate)
+# Invalidations may have been missed while the LISTEN connection was down
+listener.on_reconnect(_cache.clear)
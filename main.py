@@ -1,24 +1,21 @@
-import os
+import logging
+import time
+
 import uvicorn
 from app import create_app
-from app.db.base import Base
-from app.models.document import Document, DocumentVersion
-from app.models.user import User
-from app.models.token import RefreshToken
-from sqlalchemy import create_engine
-from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_started_at = time.perf_counter()
 
 # Create FastAPI app
 app = create_app()
 
-# Create tables on startup
+# Runs after the startup handlers of create_app, schema check included
 @app.on_event("startup")
-async def create_tables():
-    # Create tables using sync SQLAlchemy for simplicity
-    # This is only for development, in production migrations should be used
-    sync_db_url = str(settings.DATABASE_URL).replace("+asyncpg", "+psycopg2")
-    engine = create_engine(sync_db_url)
-    Base.metadata.create_all(bind=engine)
+async def log_cold_start():
+    logger.info(f"Worker cold start finished in {(time.perf_counter() - _started_at) * 1000:.0f} ms")
 
 # This is used by Gunicorn
 if __name__ == "__main__":
@@ -14,7 +14,8 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-if config.config_file_name is not None:
+# Skipped when called from the running application, which has its own logging.
+if config.config_file_name is not None and config.attributes.get("connection") is None:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -22,7 +23,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.db.base import Base
-from app.models import user, document, token
+from app.models import user, document, document_change, token, totp
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -30,7 +31,7 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
-from config import settings
+from app.core.config import settings
 config.set_main_option("sqlalchemy.url", str(settings.DATABASE_URL))
 
 
@@ -86,5 +87,8 @@ async def run_migrations_online() -> None:
 
 if context.is_offline_mode():
     run_migrations_offline()
+elif config.attributes.get("connection") is not None:
+    # Invoked programmatically with an open connection (app.db.schema.ensure_schema)
+    do_run_migrations(config.attributes["connection"])
 else:
     asyncio.run(run_migrations_online())
@@ -0,0 +1,34 @@
+"""document keyset pagination indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /documents pages on (sort_by, id); each sortable column gets a
+    # composite index so "WHERE (col, id) < (:v, :id) ORDER BY col, id LIMIT n"
+    # is a bounded index range scan in both directions.
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'])
+    op.create_index('ix_documents_updated_at_id', 'documents', ['updated_at', 'id'])
+    op.create_index('ix_documents_title_id', 'documents', ['title', 'id'])
+    # Regular users are always filtered by creator_id
+    op.create_index('ix_documents_creator_id_created_at_id', 'documents', ['creator_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_creator_id_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_title_id', table_name='documents')
+    op.drop_index('ix_documents_updated_at_id', table_name='documents')
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
@@ -0,0 +1,43 @@
+"""document full-text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_text', sa.Text(), nullable=True))
+    # Generated column, so every INSERT/UPDATE of title, description or
+    # content_text keeps the vector in sync without application code
+    op.add_column(
+        'documents',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(content_text, '')), 'C')",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('documents', 'search_vector')
+    op.drop_column('documents', 'content_text')
@@ -0,0 +1,79 @@
+"""hot path indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:40:00.000000
+
+Each index below is listed with the query it serves. Without it the plan
+for that query is a Seq Scan over the whole table; with it the plan becomes
+an Index (Only) Scan bounded by the leading column(s).
+
+documents.creator_id needs no separate index: ix_documents_creator_id_created_at_id
+(revision 0002) has it as leading column.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # EXPLAIN SELECT * FROM document_versions
+    #     WHERE document_id = :id ORDER BY version_number DESC;
+    #   -> Index Scan Backward using uq_document_versions_document_id_version_number
+    # (get_with_versions / verify, and the latest-version lookup in add_version)
+    # A version number identifies one version of a document, hence UNIQUE;
+    # it also covers plain document_id lookups, so no separate index is needed.
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        "SELECT count(*) FROM ("
+        " SELECT 1 FROM document_versions"
+        " GROUP BY document_id, version_number HAVING count(*) > 1"
+        ") AS d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} (document_id, version_number) pairs are duplicated in "
+            "document_versions; renumber them before applying this migration"
+        )
+    op.create_unique_constraint(
+        'uq_document_versions_document_id_version_number',
+        'document_versions',
+        ['document_id', 'version_number'],
+    )
+
+    # EXPLAIN SELECT document_id FROM document_access WHERE user_id = :uid;
+    # EXPLAIN ... WHERE user_id = :uid AND document_id = :did;
+    #   -> Index Only Scan using ix_document_access_user_id_document_id
+    # (the "shared with me" sub-select in search_documents, access checks)
+    # Not unique yet: grant_access still inserts a row per call.
+    op.create_index(
+        'ix_document_access_user_id_document_id',
+        'document_access',
+        ['user_id', 'document_id'],
+    )
+
+    # EXPLAIN UPDATE refresh_tokens SET is_valid = false
+    #     WHERE user_id = :uid AND is_valid = true;
+    #   -> Update on refresh_tokens -> Index Scan using ix_refresh_tokens_user_id_is_valid
+    # (invalidate_all_user_tokens, invalidate_refresh_token)
+    op.create_index(
+        'ix_refresh_tokens_user_id_is_valid',
+        'refresh_tokens',
+        ['user_id', 'is_valid'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_user_id_is_valid', table_name='refresh_tokens')
+    op.drop_index('ix_document_access_user_id_document_id', table_name='document_access')
+    op.drop_constraint(
+        'uq_document_versions_document_id_version_number',
+        'document_versions',
+        type_='unique',
+    )
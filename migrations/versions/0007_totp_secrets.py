@@ -0,0 +1,33 @@
+"""shared totp secret store
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'totp_secrets',
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('secret', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('email'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index('ix_totp_secrets_expires_at', 'totp_secrets', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_totp_secrets_expires_at', table_name='totp_secrets')
+    op.drop_table('totp_secrets')
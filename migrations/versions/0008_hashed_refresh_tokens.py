@@ -0,0 +1,44 @@
+"""hashed refresh tokens
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Refresh tokens are looked up by a fixed-length sha256 digest instead of
+    # the full JWT, the raw token is no longer stored.
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(64), nullable=True))
+    op.execute(
+        "UPDATE refresh_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')"
+    )
+    # Tokens issued to the same user within one second used to be identical
+    op.execute(
+        "DELETE FROM refresh_tokens a USING refresh_tokens b"
+        " WHERE a.token_hash = b.token_hash AND a.id < b.id"
+    )
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.create_index(op.f('ix_refresh_tokens_token_hash'), 'refresh_tokens', ['token_hash'], unique=True)
+    op.drop_index(op.f('ix_refresh_tokens_token'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'token')
+
+
+def downgrade() -> None:
+    # The original tokens cannot be recovered; existing sessions have to log in again.
+    op.add_column('refresh_tokens', sa.Column('token', sa.String(), nullable=True))
+    op.execute("UPDATE refresh_tokens SET token = token_hash, is_valid = false")
+    op.alter_column('refresh_tokens', 'token', nullable=False)
+    op.create_index(op.f('ix_refresh_tokens_token'), 'refresh_tokens', ['token'], unique=False)
+    op.drop_index(op.f('ix_refresh_tokens_token_hash'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'token_hash')
@@ -0,0 +1,105 @@
+"""document change log for delta sync
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+TABLES = ("documents", "document_versions", "document_access")
+
+
+def upgrade() -> None:
+    op.create_table(
+        'document_changes',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), server_default=sa.text('txid_current()'), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # EXPLAIN SELECT * FROM document_changes
+    #     WHERE (txid, id) > (:txid, :id) AND txid < :xmin ORDER BY txid, id LIMIT :n;
+    #   -> Index Scan using ix_document_changes_txid_id
+    op.create_index('ix_document_changes_txid_id', 'document_changes', ['txid', 'id'])
+
+    op.execute("""
+    CREATE OR REPLACE FUNCTION record_document_change() RETURNS trigger AS $$
+    DECLARE
+        rec RECORD;
+        change_action TEXT;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            rec := OLD;
+            change_action := 'deleted';
+        ELSE
+            rec := NEW;
+            change_action := CASE WHEN TG_OP = 'INSERT' THEN 'created' ELSE 'updated' END;
+        END IF;
+
+        IF TG_TABLE_NAME = 'documents' THEN
+            IF TG_OP = 'UPDATE' THEN
+                -- Background writes (content indexing) keep updated_at and are not changes
+                IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at
+                   AND NEW.is_deleted IS NOT DISTINCT FROM OLD.is_deleted THEN
+                    RETURN NULL;
+                END IF;
+                IF NEW.is_deleted AND NOT coalesce(OLD.is_deleted, false) THEN
+                    change_action := 'deleted';
+                END IF;
+            END IF;
+            INSERT INTO document_changes (document_id, entity, entity_id, action)
+            VALUES (rec.id, 'document', rec.id, change_action);
+        ELSIF TG_TABLE_NAME = 'document_versions' THEN
+            INSERT INTO document_changes (document_id, entity, entity_id, action)
+            VALUES (rec.document_id, 'version', rec.id, change_action);
+        ELSE
+            INSERT INTO document_changes (document_id, entity, entity_id, action, user_id)
+            VALUES (rec.document_id, 'access', rec.id, change_action, rec.user_id);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_record_change "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION record_document_change()"
+        )
+
+    # Seed the log with the current state so a sync from the beginning is a full mirror
+    op.execute(
+        "INSERT INTO document_changes (document_id, entity, entity_id, action) "
+        "SELECT id, 'document', id, CASE WHEN is_deleted THEN 'deleted' ELSE 'created' END "
+        "FROM documents ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO document_changes (document_id, entity, entity_id, action) "
+        "SELECT document_id, 'version', id, 'created' FROM document_versions ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO document_changes (document_id, entity, entity_id, action, user_id) "
+        "SELECT document_id, 'access', id, 'created', user_id FROM document_access ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_record_change ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS record_document_change()")
+    op.drop_index('ix_document_changes_txid_id', table_name='document_changes')
+    op.drop_table('document_changes')
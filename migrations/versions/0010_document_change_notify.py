@@ -0,0 +1,44 @@
+"""notify workers of document changes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Each change log row is announced on the document_events channel;
+    # NOTIFY is transactional, so listeners only hear about committed changes
+    op.execute("""
+    CREATE OR REPLACE FUNCTION notify_document_change() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('document_events', json_build_object(
+            'id', NEW.id,
+            'document_id', NEW.document_id,
+            'entity', NEW.entity,
+            'action', NEW.action,
+            'user_id', NEW.user_id
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        "CREATE TRIGGER document_changes_notify AFTER INSERT ON document_changes "
+        "FOR EACH ROW EXECUTE FUNCTION notify_document_change()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS document_changes_notify ON document_changes")
+    op.execute("DROP FUNCTION IF EXISTS notify_document_change()")
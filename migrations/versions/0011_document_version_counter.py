@@ -0,0 +1,39 @@
+"""per-document version counter
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # add_version takes the next number with
+    #   UPDATE documents SET last_version_number = last_version_number + 1
+    #   WHERE id = :id RETURNING last_version_number
+    # instead of SELECT max(version_number) followed by an INSERT, which
+    # raced under concurrent uploads. Numbers stay unique through
+    # uq_document_versions_document_id_version_number (0005).
+    op.add_column(
+        'documents',
+        sa.Column('last_version_number', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.execute(
+        "UPDATE documents d SET last_version_number = v.max_number "
+        "FROM (SELECT document_id, max(version_number) AS max_number "
+        "      FROM document_versions GROUP BY document_id) AS v "
+        "WHERE v.document_id = d.id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'last_version_number')
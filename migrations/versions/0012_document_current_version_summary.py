@@ -0,0 +1,41 @@
+"""current version summary on documents
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 13:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Written by create_with_version / add_version in the same statement that
+    # switches current_version_id, so they never disagree with it
+    op.add_column('documents', sa.Column('current_file_size', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('current_file_hash', sa.String(), nullable=True))
+    op.add_column('documents', sa.Column('current_storage_path', sa.String(), nullable=True))
+    op.add_column('documents', sa.Column('current_nonce', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE documents d SET "
+        "current_file_size = v.file_size, "
+        "current_file_hash = v.file_hash, "
+        "current_storage_path = v.storage_path, "
+        "current_nonce = v.nonce "
+        "FROM document_versions v "
+        "WHERE v.id = d.current_version_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'current_nonce')
+    op.drop_column('documents', 'current_storage_path')
+    op.drop_column('documents', 'current_file_hash')
+    op.drop_column('documents', 'current_file_size')
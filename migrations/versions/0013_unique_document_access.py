@@ -0,0 +1,44 @@
+"""unique document access grants
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 13:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # grant_access inserted a row per call, so pairs may repeat. Keep the row
+    # access checks already resolved to: "write" over "read", then the newest.
+    # access_level is nullable; a NULL comparison would make the row comparison
+    # NULL and keep both rows, so it counts as "not write".
+    op.execute(
+        "DELETE FROM document_access a "
+        "USING document_access b "
+        "WHERE a.document_id = b.document_id AND a.user_id = b.user_id "
+        "AND (coalesce(b.access_level = 'write', false), b.id) "
+        "> (coalesce(a.access_level = 'write', false), a.id)"
+    )
+    # ON CONFLICT (document_id, user_id) target of the grant upserts; the
+    # (user_id, document_id) index from 0005 stays for "shared with me" lookups
+    op.create_unique_constraint(
+        'uq_document_access_document_id_user_id',
+        'document_access',
+        ['document_id', 'user_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'uq_document_access_document_id_user_id',
+        'document_access',
+        type_='unique',
+    )
@@ -0,0 +1,31 @@
+"""revoked users
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Deleted users have no perm_version left; workers reload token
+    # revocations for them from here (no FK, the user row is gone)
+    op.create_table(
+        'revoked_users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('revoked_users')
@@ -0,0 +1,33 @@
+"""document change log retention horizon
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 14:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Retention deletes the oldest document_changes rows and records how far it
+    # got here; delta sync answers cursors before this position with 410
+    op.create_table(
+        'document_change_horizon',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('txid', sa.BigInteger(), nullable=False),
+        sa.Column('change_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('document_change_horizon')
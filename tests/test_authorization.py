@@ -0,0 +1,91 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.dependencies import authorize_document, authorize_documents
+from app.crud.crud_document_access import document_access_crud
+from app.schemas.user import UserPrincipal
+from app.services.authorization import DocumentAction, DocumentPermission, get_document_permission, get_document_permissions
+
+READ, WRITE, DELETE, SHARE = DocumentAction.READ, DocumentAction.WRITE, DocumentAction.DELETE, DocumentAction.SHARE
+
+# caller -> (role, relation to the document, allowed actions)
+MATRIX = {
+    "owner": ("user", "owner", {READ, WRITE, DELETE, SHARE}),
+    "owner manager": ("manager", "owner", {READ, WRITE, DELETE, SHARE}),
+    "read grant": ("user", "read", {READ}),
+    "write grant": ("user", "write", {READ, WRITE}),
+    "unrelated user": ("user", None, set()),
+    "manager": ("manager", None, {READ, WRITE, DELETE}),
+    "admin": ("admin", None, {READ, WRITE, DELETE}),
+    "admin with a read grant": ("admin", "read", {READ, WRITE, DELETE}),
+}
+
+
+@pytest.mark.parametrize("action", list(DocumentAction))
+@pytest.mark.parametrize("caller", MATRIX)
+def test_permission_matrix(caller, action):
+    role, relation, allowed = MATRIX[caller]
+    permission = DocumentPermission(
+        document=object(),
+        is_owner=relation == "owner",
+        access_level=relation if relation in ("read", "write") else None,
+        role=role,
+    )
+    assert permission.allows(action) == (action in allowed)
+
+
+@pytest.mark.parametrize("action", list(DocumentAction))
+@pytest.mark.parametrize("role", ["user", "manager", "admin"])
+def test_missing_document_allows_nothing(role, action):
+    assert not DocumentPermission(document=None, role=role).allows(action)
+
+
+async def _caller(make_user, make_document, caller):
+    role, relation, allowed = MATRIX[caller]
+    user = await make_user(role=role)
+    owner = user if relation == "owner" else await make_user()
+    document = await make_document(owner)
+    return user, document, relation, allowed
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("caller", MATRIX)
+async def test_permission_matrix_from_the_database(db, make_user, make_document, caller):
+    user, document, relation, allowed = await _caller(make_user, make_document, caller)
+    if relation in ("read", "write"):
+        await document_access_crud.grant_access(db, document_id=document.id, user_id=user.id, access_level=relation)
+    principal = UserPrincipal(id=user.id, role=user.role, is_active=True)
+
+    permission = await get_document_permission(db, document.id, principal)
+    assert {action for action in DocumentAction if permission.allows(action)} == allowed
+    permissions = await get_document_permissions(db, [document.id, document.id + 1_000_000], principal)
+    assert permissions[document.id] == permission
+    assert not permissions[document.id + 1_000_000].exists
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("role", ["manager", "admin"])
+async def test_only_the_owner_can_share(db, make_user, make_document, role):
+    owner = await make_user()
+    document = await make_document(owner)
+    principal = UserPrincipal(id=(await make_user(role=role)).id, role=role, is_active=True)
+
+    with pytest.raises(HTTPException) as error:
+        await authorize_document(db, document.id, principal, SHARE)
+    assert error.value.status_code == 403
+    assert error.value.detail == "Only owner can share documents"
+
+    owner_principal = UserPrincipal(id=owner.id, role="user", is_active=True)
+    assert (await authorize_document(db, document.id, owner_principal, SHARE)).id == document.id
+
+
+@pytest.mark.asyncio
+async def test_batch_authorization_reports_each_denied_id(db, make_user, make_document):
+    user = await make_user()
+    own = await make_document(user)
+    other = await make_document(await make_user())
+    principal = UserPrincipal(id=user.id, role="user", is_active=True)
+
+    documents, errors = await authorize_documents(db, [other.id, own.id, own.id + 1_000_000], principal, READ)
+    assert [document.id for document in documents] == [own.id]
+    assert [(error["id"], error["status"]) for error in errors] == [(other.id, 403), (own.id + 1_000_000, 404)]
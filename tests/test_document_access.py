@@ -0,0 +1,163 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import func, select, text
+
+from app.core.config import settings
+from app.crud.crud_document_access import document_access_crud
+from app.models.document import DocumentAccess
+from app.models.document_change import DocumentChange
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+
+def load_migration(name):
+    spec = importlib.util.spec_from_file_location(name, MIGRATIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def upgrade(sync_conn, migration):
+    with Operations.context(MigrationContext.configure(sync_conn)):
+        migration.upgrade()
+
+
+async def access_changes(db, document_id):
+    result = await db.execute(
+        select(DocumentChange.action)
+        .where(DocumentChange.document_id == document_id, DocumentChange.entity == "access")
+        .order_by(DocumentChange.id)
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_unique_grants_migration_keeps_one_row_per_pair(db, make_user, make_document):
+    owner, writer, reader, unset = [await make_user() for _ in range(4)]
+    document = await make_document(owner)
+    # Rolled back with the test transaction
+    await db.execute(text(
+        "ALTER TABLE document_access DROP CONSTRAINT uq_document_access_document_id_user_id"
+    ))
+
+    async def grant(user, access_level):
+        access = DocumentAccess(document_id=document.id, user_id=user.id, access_level=access_level)
+        db.add(access)
+        await db.flush()
+        return access.id
+
+    await grant(writer, "read")
+    await grant(writer, None)
+    kept_write = await grant(writer, "write")
+    await grant(writer, "read")
+    await grant(reader, None)
+    kept_read = await grant(reader, "read")
+    await grant(unset, "read")
+    kept_unset = await grant(unset, None)
+
+    connection = await db.connection()
+    await connection.run_sync(upgrade, load_migration("0013_unique_document_access"))
+
+    result = await db.execute(
+        select(DocumentAccess.id).where(DocumentAccess.document_id == document.id).order_by(DocumentAccess.id)
+    )
+    # "write" wins over the newer "read"; otherwise the newest row, NULL level or not
+    assert list(result.scalars().all()) == sorted([kept_write, kept_read, kept_unset])
+
+
+@pytest.mark.asyncio
+async def test_regrant_replaces_a_null_level(db, make_user, make_document):
+    owner, user = await make_user(), await make_user()
+    document = await make_document(owner)
+    db.add(DocumentAccess(document_id=document.id, user_id=user.id, access_level=None))
+    await db.flush()
+
+    access = await document_access_crud.grant_access(
+        db, document_id=document.id, user_id=user.id, access_level="read"
+    )
+    assert access.access_level == "read"
+    stored = await db.scalar(
+        select(DocumentAccess.access_level).where(
+            DocumentAccess.document_id == document.id, DocumentAccess.user_id == user.id
+        )
+    )
+    assert stored == "read"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_regrants_are_not_written(db, make_user, make_document):
+    owner, reader, writer = await make_user(), await make_user(), await make_user()
+    document = await make_document(owner)
+    await document_access_crud.grant_access_bulk(
+        db, grants=[(document.id, reader.id, "read"), (document.id, writer.id, "read")]
+    )
+    assert await access_changes(db, document.id) == ["created", "created"]
+
+    granted = await document_access_crud.grant_access_bulk(
+        db, grants=[(document.id, reader.id, "read"), (document.id, writer.id, "write")]
+    )
+    # Both grants are returned, only the changed one is written
+    assert sorted((access.user_id, access.access_level) for access in granted) == [
+        (reader.id, "read"), (writer.id, "write")
+    ]
+    assert await access_changes(db, document.id) == ["created", "created", "updated"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_grant_keeps_the_last_level_of_a_repeated_pair(db, make_user, make_document):
+    owner, user = await make_user(), await make_user()
+    document = await make_document(owner)
+    granted = await document_access_crud.grant_access_bulk(
+        db, grants=[(document.id, user.id, "write"), (document.id, user.id, "read")]
+    )
+    assert [(access.user_id, access.access_level) for access in granted] == [(user.id, "read")]
+
+
+@pytest.mark.asyncio
+async def test_bulk_revoke_counts_removed_grants(db, make_user, make_document):
+    owner, first, second = await make_user(), await make_user(), await make_user()
+    document = await make_document(owner)
+    await document_access_crud.grant_access_bulk(
+        db, grants=[(document.id, first.id, "read"), (document.id, second.id, "read")]
+    )
+
+    revoked = await document_access_crud.revoke_access_bulk(
+        db, grants=[(document.id, first.id), (document.id, first.id), (document.id, owner.id)]
+    )
+    assert revoked == 1
+    remaining = await db.scalar(
+        select(func.count()).select_from(DocumentAccess).where(DocumentAccess.document_id == document.id)
+    )
+    assert remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_sharing_with_unknown_users_is_rejected(db, db_client, make_user, make_document, auth_headers):
+    owner, user = await make_user(), await make_user()
+    document = await make_document(owner)
+    missing = user.id + 1_000_000
+
+    response = await db_client.post(
+        f"{settings.API_V1_STR}/documents/shares",
+        json={"grants": [
+            {"document_id": document.id, "user_id": user.id, "access_level": "read"},
+            {"document_id": document.id, "user_id": missing, "access_level": "read"},
+        ]},
+        headers=auth_headers(owner),
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == [{"user_id": missing, "status": 422, "detail": "User not found"}]
+
+    response = await db_client.post(
+        f"{settings.API_V1_STR}/documents/{document.id}/share",
+        json={"user_id": missing, "access_level": "read"},
+        headers=auth_headers(owner),
+    )
+    assert response.status_code == 422
+
+    # All or nothing: the known user got no grant either
+    assert await access_changes(db, document.id) == []
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.security import create_access_token, user_claims
+from app.services import token_revocation
+
+USER_ID = 4242
+
+
+def auth_headers(expires_delta=None):
+    user = SimpleNamespace(role="user", is_active=True, perm_version=0)
+    token = create_access_token(USER_ID, expires_delta=expires_delta, claims=user_claims(user))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(token_revocation, "_min_versions", {})
+    monkeypatch.setattr(settings, "DOCUMENT_EVENTS_KEEPALIVE", 0.2)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_stream_closes_when_the_token_expires(client):
+    started = time.monotonic()
+    async with client:
+        response = await asyncio.wait_for(
+            client.get(f"{settings.API_V1_STR}/documents/events", headers=auth_headers(timedelta(seconds=2))),
+            timeout=10,
+        )
+    assert response.status_code == 200
+    assert response.text.endswith('event: reauthenticate\ndata: {"type": "reauthenticate", "reason": "expired"}\n\n')
+    assert ": keep-alive" in response.text
+    assert time.monotonic() - started < 4
+
+
+@pytest.mark.asyncio
+async def test_stream_closes_when_the_token_is_revoked(client):
+    async with client:
+        request = asyncio.create_task(
+            client.get(f"{settings.API_V1_STR}/documents/events", headers=auth_headers())
+        )
+        await asyncio.sleep(0.3)
+        assert not request.done()
+        # What a permission change or user deletion does in every worker
+        token_revocation._set_version(USER_ID, 1)
+        response = await asyncio.wait_for(request, timeout=5)
+    assert response.text.endswith('event: reauthenticate\ndata: {"type": "reauthenticate", "reason": "revoked"}\n\n')
+
+
+@pytest.mark.asyncio
+async def test_stream_does_not_hold_a_session_for_tokens_without_claims(client, monkeypatch):
+    from app.api import dependencies
+
+    sessions = []
+
+    class Session:
+        async def __aenter__(self):
+            sessions.append("open")
+            return self
+
+        async def __aexit__(self, *exc_info):
+            sessions.append("closed")
+
+    async def get_cached_user(db, user_id):
+        return SimpleNamespace(id=user_id, role="user", is_active=True)
+
+    monkeypatch.setattr(dependencies, "SessionLocal", Session)
+    monkeypatch.setattr(dependencies, "get_cached_user", get_cached_user)
+    # Issued before tokens carried role claims
+    headers = {"Authorization": f"Bearer {create_access_token(USER_ID, expires_delta=timedelta(seconds=2))}"}
+    async with client:
+        request = asyncio.create_task(client.get(f"{settings.API_V1_STR}/documents/events", headers=headers))
+        await asyncio.sleep(0.3)
+        assert not request.done()
+        assert sessions == ["open", "closed"]
+        response = await asyncio.wait_for(request, timeout=5)
+    assert response.status_code == 200
@@ -0,0 +1,153 @@
+import asyncio
+import socket
+import time
+
+import pytest
+import pytest_asyncio
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.core.config import settings
+from app.services import email as email_module
+from app.services.email import EmailQueue
+
+
+class Handler:
+    """
+    Answers DATA with the next scripted reply ("250 OK" once the script runs out).
+    """
+
+    def __init__(self, replies=()):
+        self.replies = list(replies)
+        self.attempts = []
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts.append(time.monotonic())
+        reply = self.replies.pop(0) if self.replies else "250 OK"
+        if reply.startswith("250"):
+            self.delivered.append(envelope)
+        return reply
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    servers = []
+
+    def start(replies=()):
+        handler = Handler(replies)
+        controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+        monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+        return handler
+
+    monkeypatch.setattr(settings, "EMAILS_ENABLED", True)
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", None)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF", 0.05)
+    monkeypatch.setattr(settings, "EMAIL_MAX_RETRIES", 3)
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+@pytest_asyncio.fixture
+async def queue(monkeypatch):
+    queue = EmailQueue()
+    monkeypatch.setattr(email_module, "email_queue", queue)
+    queue.start()
+    yield queue
+    await queue.stop()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_sends_queued_email(smtp_server, queue):
+    handler = smtp_server()
+    assert await email_module.send_email("a@example.com", "Hello", "<p>Hi</p>")
+
+    await wait_for(lambda: queue.sent == 1)
+    assert handler.delivered[0].rcpt_tos == ["a@example.com"]
+    assert b"Subject: Hello" in handler.delivered[0].content
+
+
+@pytest.mark.asyncio
+async def test_retries_with_backoff(smtp_server, queue):
+    handler = smtp_server(["451 Try again later", "451 Try again later"])
+    await email_module.send_email("a@example.com", "Hello", "<p>Hi</p>")
+
+    await wait_for(lambda: queue.sent == 1)
+    assert queue.failed == 2
+    assert len(handler.attempts) == 3
+    first_gap = handler.attempts[1] - handler.attempts[0]
+    second_gap = handler.attempts[2] - handler.attempts[1]
+    assert first_gap >= settings.EMAIL_RETRY_BACKOFF
+    assert second_gap >= 2 * settings.EMAIL_RETRY_BACKOFF
+    assert not queue.dead_letters
+
+
+@pytest.mark.asyncio
+async def test_dead_letters_after_max_retries(smtp_server, queue):
+    handler = smtp_server(["550 Mailbox unavailable"] * 10)
+    await email_module.send_email("a@example.com", "Hello", "<p>Hi</p>")
+
+    await wait_for(lambda: queue.dead_letters)
+    assert len(handler.attempts) == settings.EMAIL_MAX_RETRIES
+    assert queue.dead_letters[0]["attempts"] == settings.EMAIL_MAX_RETRIES
+    assert queue.dead_letters[0]["subject"] == "Hello"
+    assert queue.sent == 0
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_is_dead_lettered_and_delivery_continues(smtp_server, queue, monkeypatch):
+    handler = smtp_server()
+    send_message = email_module.aiosmtplib.SMTP.send_message
+
+    async def broken_for_first(self, message, *args, **kwargs):
+        if message["To"] == "broken@example.com":
+            raise RuntimeError("boom")
+        return await send_message(self, message, *args, **kwargs)
+
+    monkeypatch.setattr(email_module.aiosmtplib.SMTP, "send_message", broken_for_first)
+    await email_module.send_email("broken@example.com", "Hello", "<p>Hi</p>")
+    await email_module.send_email("a@example.com", "Hello", "<p>Hi</p>")
+
+    await wait_for(lambda: queue.sent == 1)
+    assert queue.dead_letters[0]["email_to"] == "broken@example.com"
+    assert queue.dead_letters[0]["attempts"] == 1
+    assert handler.delivered[0].rcpt_tos == ["a@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_delivery_task_is_restarted(smtp_server, queue, monkeypatch):
+    handler = smtp_server()
+    next_batch = queue._next_batch
+    calls = []
+
+    async def fails_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return await next_batch()
+
+    monkeypatch.setattr(queue, "_next_batch", fails_once)
+    queue._task.cancel()
+    queue._start_task()
+    await email_module.send_email("a@example.com", "Hello", "<p>Hi</p>")
+
+    await wait_for(lambda: queue.sent == 1)
+    assert len(handler.delivered) == 1
@@ -0,0 +1,95 @@
+import pytest
+
+from app.core.config import settings
+from app.core.etag import etag_matches, weak_etag
+from app.crud.crud_document_access import document_access_crud
+
+ETAG = weak_etag("documents", 1)
+OPAQUE = ETAG.removeprefix("W/")
+
+
+def test_weak_etag_depends_on_every_part():
+    assert ETAG.startswith('W/"') and ETAG.endswith('"')
+    assert weak_etag("documents", 1) == ETAG
+    assert weak_etag("documents", 2) != ETAG
+    assert weak_etag("documents", 1, None) != ETAG
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    (" * ", True),
+    (ETAG, True),
+    # Weak comparison: the strong form of the same tag matches too
+    (OPAQUE, True),
+    (f'W/"other", {ETAG}', True),
+    (f'"other",{OPAQUE}', True),
+    ('W/"other", "another"', False),
+    (OPAQUE.strip('"'), False),
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, ETAG) is matches
+
+
+@pytest.mark.asyncio
+async def test_document_list_answers_304_until_grants_change(db, db_client, make_user, make_document, auth_headers):
+    user = await make_user()
+    other = await make_user()
+    await make_document(user)
+    shared = await make_document(other)
+    url = f"{settings.API_V1_STR}/documents"
+
+    response = await db_client.get(url, headers=auth_headers(user))
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    for if_none_match in (etag, "*", f'W/"stale", {etag}'):
+        response = await db_client.get(url, headers=auth_headers(user, **{"If-None-Match": if_none_match}))
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    # Another query string is another representation
+    response = await db_client.get(url, params={"limit": 10}, headers=auth_headers(user, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+
+    await document_access_crud.grant_access(db, document_id=shared.id, user_id=user.id, access_level="read")
+    response = await db_client.get(url, headers=auth_headers(user, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    granted_etag = response.headers["ETag"]
+    assert granted_etag != etag
+
+    await document_access_crud.revoke_access(db, document_id=shared.id, user_id=user.id)
+    response = await db_client.get(url, headers=auth_headers(user, **{"If-None-Match": granted_etag}))
+    assert response.status_code == 200
+    # Back to the state before the grant
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_document_list_etags_are_per_user(db_client, make_user, make_document, auth_headers):
+    admin = await make_user(role="admin")
+    manager = await make_user(role="manager")
+    await make_document(admin)
+    url = f"{settings.API_V1_STR}/documents"
+
+    etag = (await db_client.get(url, headers=auth_headers(admin))).headers["ETag"]
+    response = await db_client.get(url, headers=auth_headers(manager, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_document_read_answers_304(db_client, make_user, make_document, auth_headers):
+    user = await make_user()
+    document = await make_document(user)
+    url = f"{settings.API_V1_STR}/documents/{document.id}"
+
+    response = await db_client.get(url, headers=auth_headers(user))
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    response = await db_client.get(url, headers=auth_headers(user, **{"If-None-Match": etag}))
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
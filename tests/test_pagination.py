@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.pagination import cursor_for, cursor_value, decode_cursor, encode_cursor
+from app.crud.crud_document import document_crud
+from app.models.document import Document
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_cursor_round_trip_keeps_datetimes_and_direction():
+    token = encode_cursor("created_at", "desc", CREATED_AT, 42, "prev")
+    assert decode_cursor(token) == {
+        "sort_by": "created_at",
+        "sort_order": "desc",
+        "value": CREATED_AT,
+        "id": 42,
+        "direction": "prev",
+    }
+
+
+def test_cursor_defaults_to_next():
+    assert decode_cursor(encode_cursor("title", "asc", "a", 1))["direction"] == "next"
+
+
+@pytest.mark.parametrize("token", ["", "not a cursor", encode_cursor("title", "asc", "a", 1, "sideways")])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize("value, python_type", [
+    (True, int),
+    ("1", int),
+    (2**31, int),
+    (1, str),
+    ("a\x00b", str),
+    ("2026-01-01", datetime),
+])
+def test_cursor_value_rejects_values_of_the_wrong_type(value, python_type):
+    with pytest.raises(ValueError):
+        cursor_value(value, python_type)
+
+
+async def _page(db, creator, cursor=None, limit=2, sort_by="created_at", sort_order="desc"):
+    query = select(Document).where(Document.creator_id == creator.id)
+    page = await document_crud.paginate(
+        db, query=query, sort_by=sort_by, sort_order=sort_order, limit=limit, cursor=cursor
+    )
+    return [document.id for document in page["items"]], page["next_cursor"], page["prev_cursor"]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_break_created_at_ties_by_id(db, make_user, make_document):
+    creator = await make_user()
+    ids = [(await make_document(creator, created_at=CREATED_AT)).id for _ in range(5)]
+    newest_first = sorted(ids, reverse=True)
+
+    page_1, next_1, prev_1 = await _page(db, creator)
+    assert page_1 == newest_first[:2]
+    assert prev_1 is None
+
+    page_2, next_2, prev_2 = await _page(db, creator, next_1)
+    assert page_2 == newest_first[2:4]
+
+    page_3, next_3, prev_3 = await _page(db, creator, next_2)
+    assert page_3 == newest_first[4:]
+    assert next_3 is None
+
+    # Walking back returns the same pages in the same order
+    assert await _page(db, creator, prev_3) == (page_2, next_2, prev_2)
+    back_1, _, back_prev = await _page(db, creator, prev_2)
+    assert back_1 == page_1
+    assert back_prev is None
+
+
+@pytest.mark.asyncio
+async def test_extra_row_probe_reports_no_next_page_on_an_exact_fit(db, make_user, make_document):
+    creator = await make_user()
+    for title in ("b", "a", "c", "d"):
+        await make_document(creator, title=title)
+
+    titles = []
+    cursor = None
+    for _ in range(2):
+        page = await document_crud.paginate(
+            db,
+            query=select(Document).where(Document.creator_id == creator.id),
+            sort_by="title",
+            sort_order="asc",
+            limit=2,
+            cursor=cursor,
+        )
+        titles += [document.title for document in page["items"]]
+        cursor = page["next_cursor"]
+    assert titles == ["a", "b", "c", "d"]
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_cursor_for_another_sorting_is_rejected(db, make_user, make_document):
+    creator = await make_user()
+    document = await make_document(creator)
+    with pytest.raises(ValueError):
+        await _page(db, creator, cursor_for(document, "title", "asc"))
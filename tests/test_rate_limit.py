@@ -0,0 +1,211 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.api.v1.endpoints import auth as auth_endpoints
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import (
+    MemoryRateLimitBackend,
+    Rate,
+    RateLimitBackend,
+    RateLimiter,
+    RateLimitMiddleware,
+    RedisRateLimitBackend,
+    rate_limiter,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    # fakeredis runs EVALSHA through lupa
+    pytest.importorskip("lupa")
+    return RedisRateLimitBackend(fakeredis.FakeAsyncRedis())
+
+
+def scope(forwarded=None, client="10.0.0.2"):
+    headers = [(b"x-forwarded-for", value.encode("latin-1")) for value in forwarded or []]
+    return {"type": "http", "headers": headers, "client": (client, 12345)}
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitBackend()
+
+
+def test_forwarded_header_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+    assert RateLimitMiddleware._client_ip(scope(["1.2.3.4"])) == "10.0.0.2"
+
+
+def test_spoofed_entries_left_of_the_proxy_are_ignored(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+    # nginx appended 203.0.113.7 to what the client sent
+    assert RateLimitMiddleware._client_ip(scope(["1.2.3.4, 203.0.113.7"])) == "203.0.113.7"
+
+
+def test_two_proxies_and_repeated_headers(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 2)
+    assert RateLimitMiddleware._client_ip(scope(["1.2.3.4, 203.0.113.7", "10.0.0.9"])) == "203.0.113.7"
+
+
+def test_fewer_entries_than_proxies_falls_back_to_peer(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 2)
+    assert RateLimitMiddleware._client_ip(scope(["203.0.113.7"])) == "10.0.0.2"
+
+
+@pytest.mark.parametrize("value, capacity, refill_rate", [("10/minute", 10, 10 / 60), ("2/second", 2, 2)])
+def test_rate_parse(value, capacity, refill_rate):
+    rate = Rate.parse(value)
+    assert (rate.capacity, rate.refill_rate) == (capacity, refill_rate)
+
+
+@pytest.mark.parametrize("value", ["10", "0/minute", "10/fortnight", "ten/minute"])
+def test_rate_parse_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        Rate.parse(value)
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_allows_a_burst_then_refills(clock):
+    backend = MemoryRateLimitBackend()
+    rate = Rate(3, 60)
+    assert [await backend.consume("k", rate) for _ in range(3)] == [(True, 0.0)] * 3
+    allowed, retry_after = await backend.consume("k", rate)
+    assert not allowed
+    assert retry_after == pytest.approx(20)
+    # Other keys have buckets of their own
+    assert (await backend.consume("other", rate))[0]
+
+    clock.now += 19
+    assert not (await backend.consume("k", rate))[0]
+    clock.now += 1
+    assert (await backend.consume("k", rate))[0]
+
+    # Refill never exceeds the burst capacity
+    clock.now += 3600
+    assert [(await backend.consume("k", rate))[0] for _ in range(4)] == [True, True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_the_least_recently_used_bucket(clock):
+    backend = MemoryRateLimitBackend(maxsize=2)
+    rate = Rate(1, 60)
+    await backend.consume("a", rate)
+    await backend.consume("b", rate)
+    await backend.consume("a", rate)
+    await backend.consume("c", rate)
+    assert list(backend._buckets) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_redis_bucket_allows_a_burst_then_refills(redis_backend):
+    rate = Rate(2, 1)
+    assert [await redis_backend.consume("k", rate) for _ in range(2)] == [(True, 0.0)] * 2
+    allowed, retry_after = await redis_backend.consume("k", rate)
+    assert not allowed
+    assert 0 < retry_after <= 0.5
+    assert (await redis_backend.consume("other", rate))[0]
+
+    await asyncio.sleep(retry_after + 0.05)
+    assert (await redis_backend.consume("k", rate))[0]
+
+
+@pytest.mark.asyncio
+async def test_redis_bucket_expires_once_full_again(redis_backend):
+    await redis_backend.consume("k", Rate(10, 60))
+    ttl = await redis_backend._client.ttl(RedisRateLimitBackend.KEY_PREFIX + "k")
+    assert 0 < ttl <= 61
+
+
+@pytest.mark.asyncio
+async def test_backend_errors_let_requests_through():
+    class BrokenBackend(RateLimitBackend):
+        async def consume(self, key, rate, cost=1):
+            raise ConnectionError("down")
+
+    assert await RateLimiter(BrokenBackend()).check("k", Rate(1, 60)) is None
+
+
+@pytest.mark.asyncio
+async def test_middleware_answers_429_with_retry_after(clock):
+    async def app(scope, receive, send):
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    middleware = RateLimitMiddleware(app, limiter=RateLimiter(MemoryRateLimitBackend()))
+    middleware.ip_rate = Rate(2, 60)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+        statuses = [(await client.get(f"{settings.API_V1_STR}/documents")).status_code for _ in range(2)]
+        response = await client.get(f"{settings.API_V1_STR}/documents")
+        # Only the API is limited
+        assert (await client.get("/docs")).status_code == 200
+    assert statuses == [200, 200]
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+
+
+@pytest.fixture
+def login_client(monkeypatch, clock):
+    from main import app
+
+    async def authenticate_user(db, email, password):
+        return None
+
+    async def verify_totp(email, code):
+        return False
+
+    monkeypatch.setattr(rate_limiter, "backend", MemoryRateLimitBackend())
+    monkeypatch.setattr(auth_endpoints, "login_account_rate", Rate(2, 60))
+    monkeypatch.setattr(auth_endpoints, "authenticate_user", authenticate_user)
+    monkeypatch.setattr(auth_endpoints, "verify_totp", verify_totp)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_login_attempts_are_limited_per_account(login_client):
+    url = f"{settings.API_V1_STR}/auth/login-init"
+    async with login_client as client:
+        statuses = [
+            (await client.post(url, data={"username": username, "password": "wrong"})).status_code
+            for username in ("a@example.com", "A@Example.com", "a@example.com")
+        ]
+        limited = await client.post(url, data={"username": "a@example.com", "password": "wrong"})
+        other = await client.post(url, data={"username": "b@example.com", "password": "wrong"})
+    assert statuses == [401, 401, 429]
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "30"
+    assert other.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_totp_attempts_are_limited_per_account(login_client):
+    url = f"{settings.API_V1_STR}/auth/login"
+    async with login_client as client:
+        statuses = [
+            (await client.post(url, json={"email": "a@example.com", "totp_code": "000000"})).status_code
+            for _ in range(3)
+        ]
+        # Separate from the password step's bucket
+        login = await client.post(
+            f"{settings.API_V1_STR}/auth/login-init", data={"username": "a@example.com", "password": "wrong"}
+        )
+    assert statuses == [401, 401, 429]
+    assert login.status_code == 401
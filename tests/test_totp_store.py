@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import pyotp
+import pytest
+
+from app.core.config import settings
+from app.services import auth
+from app.services import totp_store as totp_store_module
+from app.services.totp_store import MemoryTOTPSecretStore, PostgresTOTPSecretStore, RedisTOTPSecretStore, TOTPSecretStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(totp_store_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisTOTPSecretStore(fakeredis.FakeAsyncRedis())
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        TOTPSecretStore()
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_after_ttl(clock):
+    store = MemoryTOTPSecretStore()
+    await store.set("a@example.com", "SECRET", ttl=30)
+    assert await store.get("a@example.com") == "SECRET"
+
+    clock.now += 31
+    assert await store.get("a@example.com") is None
+    assert await store.consume("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_store_sweep_removes_only_expired(clock):
+    store = MemoryTOTPSecretStore()
+    await store.set("old@example.com", "OLD", ttl=10)
+    await store.set("new@example.com", "NEW", ttl=60)
+
+    clock.now += 11
+    assert await store.sweep() == 1
+    assert await store.get("old@example.com") is None
+    assert await store.get("new@example.com") == "NEW"
+
+
+@pytest.mark.asyncio
+async def test_memory_store_consume_is_single_use(clock):
+    store = MemoryTOTPSecretStore()
+    await store.set("a@example.com", "SECRET", ttl=30)
+
+    results = await asyncio.gather(*(store.consume("a@example.com") for _ in range(5)))
+    assert results.count("SECRET") == 1
+    assert await store.get("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_store_sets_ttl(redis_store):
+    await redis_store.set("a@example.com", "SECRET", ttl=30)
+    assert await redis_store.get("a@example.com") == "SECRET"
+    ttl = await redis_store._client.ttl(RedisTOTPSecretStore.KEY_PREFIX + "a@example.com")
+    assert 0 < ttl <= 30
+    # Expiry is native, there is nothing to sweep
+    assert await redis_store.sweep() == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_store_expires(redis_store):
+    await redis_store.set("a@example.com", "SECRET", ttl=1)
+    await asyncio.sleep(1.1)
+    assert await redis_store.get("a@example.com") is None
+    assert await redis_store.consume("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_store_consume_is_single_use(redis_store):
+    await redis_store.set("a@example.com", "SECRET", ttl=30)
+
+    results = await asyncio.gather(*(redis_store.consume("a@example.com") for _ in range(5)))
+    assert results.count("SECRET") == 1
+    assert await redis_store.get("a@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_verify_totp_accepts_a_code_once(monkeypatch, clock):
+    store = MemoryTOTPSecretStore()
+    monkeypatch.setattr(auth, "totp_store", store)
+    code, _ = await auth.generate_totp_code("a@example.com")
+
+    results = await asyncio.gather(*(auth.verify_totp("a@example.com", code) for _ in range(3)))
+    assert results.count(True) == 1
+
+
+@pytest.mark.asyncio
+async def test_verify_totp_wrong_code_uses_up_the_secret(monkeypatch, clock):
+    store = MemoryTOTPSecretStore()
+    monkeypatch.setattr(auth, "totp_store", store)
+    code, secret = await auth.generate_totp_code("a@example.com")
+    wrong = pyotp.TOTP(pyotp.random_base32(), digits=settings.TOTP_DIGITS).now()
+    if wrong == code:
+        wrong = str((int(code) + 1) % 10 ** settings.TOTP_DIGITS).zfill(settings.TOTP_DIGITS)
+
+    assert await auth.verify_totp("a@example.com", wrong) is False
+    assert await auth.verify_totp("a@example.com", code) is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL")
+async def test_postgres_store_consume_is_single_use():
+    from app.db.session import engine
+    from app.models.totp import TOTPSecret
+
+    async with engine.begin() as conn:
+        await conn.run_sync(TOTPSecret.__table__.create, checkfirst=True)
+    store = PostgresTOTPSecretStore()
+    try:
+        await store.set("a@example.com", "SECRET", ttl=30)
+        results = await asyncio.gather(*(store.consume("a@example.com") for _ in range(5)))
+        assert results.count("SECRET") == 1
+
+        await store.set("old@example.com", "OLD", ttl=-1)
+        assert await store.get("old@example.com") is None
+        assert await store.sweep() == 1
+    finally:
+        await store.delete("a@example.com")
+        await engine.dispose()